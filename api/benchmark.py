@@ -0,0 +1,279 @@
+'''
+To run:
+python api/benchmark.py
+python api/benchmark.py --save-baseline   # Record the results as the baseline to compare against
+python api/benchmark.py --check           # Exit with an error if any stage regressed
+
+Benchmarks for the curation and censor hot paths, run on synthetic Genius-style lyrics
+so no network access or API keys are needed. Each stage is timed separately on corpora
+of 1k, 10k and 100k songs, reporting throughput and peak memory, and compared against a
+stored baseline. Baselines are only meaningful on the machine that recorded them.
+'''
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+from columnar_data import dump_songs, load_songs
+from censor_lyrics import censor_text, censor_game_data, decode_banned_words, get_censor_engine, load_censor_overrides, load_json_file
+from lyrics_processing import LyricsNormalizer, extract_chorus, find_chorus_lines, trim_chorus, CHORUS_MAX_WORDS
+
+#region Global Variable Declarations
+WORDS = ("love baby night heart tonight feel know want never gonna dance away time "
+         "life world fire light dream run free money rain summer city girl boy").split()
+api_dir = os.path.dirname(os.path.abspath(__file__))
+banned_words_path = os.path.join(api_dir, 'bannedWords.json')
+censor_overrides_path = os.path.join(api_dir, 'censorOverrides.json')
+benchmark_baseline_json = 'data/benchmarkBaseline.json'
+CORPUS_SIZES = [1000, 10000, 100000]
+REGRESSION_TOLERANCE = 0.25  # Fraction of baseline throughput a stage may lose before it's flagged
+#endregion Global Variable Declarations
+
+#region Functions
+def generate_section(rng, header, line_count):
+    lines = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 9))) for _ in range(line_count)]
+    return header + '\n' + '\n'.join(lines)
+
+def generate_lyrics(rng, chorus_lines=8):
+    """Generate cleaned up lyrics with a verse, a chorus of chorus_lines lines and an outro."""
+    sections = [
+        generate_section(rng, '[Verse 1]', 8),
+        generate_section(rng, '[Chorus]', chorus_lines),
+        generate_section(rng, '[Verse 2]', 8),
+        generate_section(rng, '[Outro]', 4),
+    ]
+    return '\n\n'.join(sections)
+
+def generate_raw_section(rng, header, line_count, banned_words):
+    """Generate a section the way Genius returns it, with ad-libs, curly quotes and the odd banned word."""
+    lines = []
+    for _ in range(line_count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 9))]
+        if banned_words and rng.random() < 0.15:
+            words[rng.randrange(len(words))] = rng.choice(banned_words)
+        if rng.random() < 0.2:
+            words.append(f"({rng.choice(WORDS)})")
+        if rng.random() < 0.1:
+            words[0] = words[0] + '\u2019s'
+        lines.append(' '.join(words))
+    return header + '\n' + '\n'.join(lines)
+
+def generate_raw_lyrics(rng, banned_words):
+    """Generate lyrics as lyricsgenius returns them, before clean_up_lyrics."""
+    title = ' '.join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 3)))
+    sections = [
+        generate_raw_section(rng, '[Intro]', 2, banned_words),
+        generate_raw_section(rng, '[Verse 1]', 8, banned_words),
+        generate_raw_section(rng, '[Chorus]', rng.randint(4, 12), banned_words),
+        generate_raw_section(rng, '[Verse 2]', 8, banned_words),
+        generate_raw_section(rng, '[Chorus]', 6, banned_words),
+        generate_raw_section(rng, '[Outro]', 4, banned_words),
+    ]
+    lyrics = '\n'.join(sections)
+    if rng.random() < 0.5:
+        lyrics = lyrics.replace('[Verse 2]', 'You might also like[Verse 2]', 1)
+    return f"{rng.randint(1, 300)} Contributors{title} Lyrics{lyrics}{rng.randint(1, 99)}Embed"
+
+def legacy_extract_chorus(lyrics, max_words=CHORUS_MAX_WORDS):
+    """The original get_chorus regex and line-by-line trimming loop, for comparison."""
+    chorus_indicator_line = ''
+    for line in lyrics.split('\n'):
+        if '[Chorus' in line:
+            chorus_indicator_line = line
+            break
+    if chorus_indicator_line == '':
+        return None
+
+    chorus = ''
+    chorus_content = re.search(rf"{re.escape(chorus_indicator_line)}(.*?)\n\n", lyrics, re.DOTALL)
+    if chorus_content:
+        chorus = chorus_content.group(1)
+    chorus = chorus.strip('\n')
+    if chorus == '':
+        return None
+
+    words = chorus.split()
+    while len(words) > max_words:
+        chorus = '\n'.join(chorus.split('\n')[:-1])
+        words = chorus.split()
+    return chorus, len(words), len(set(words))
+
+def time_per_call(function, inputs, repeat):
+    """Return the best average time per call in seconds over repeat runs."""
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for item in inputs:
+            function(item)
+        elapsed = (time.perf_counter() - started_at) / len(inputs)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def benchmark_chorus(rng, song_count, repeat):
+    """Compare chorus extraction and trimming against the original approach as choruses grow."""
+    print("\n=== Chorus extraction and trimming ===\n")
+    print(f"{'Chorus lines':>12}  {'Original (us)':>14}  {'Current (us)':>13}  {'Speedup':>8}")
+
+    for chorus_lines in (8, 32, 128, 512):
+        lyrics = [generate_lyrics(rng, chorus_lines) for _ in range(song_count)]
+
+        # Both approaches must agree before their timings mean anything
+        for item in lyrics:
+            chorus = extract_chorus(item)
+            if legacy_extract_chorus(item) != (chorus.text, chorus.total_words, chorus.unique_words):
+                raise AssertionError("Chorus extraction differs from the original approach")
+
+        legacy = time_per_call(legacy_extract_chorus, lyrics, repeat)
+        current = time_per_call(extract_chorus, lyrics, repeat)
+        print(f"{chorus_lines:>12}  {legacy * 1e6:>14.1f}  {current * 1e6:>13.1f}  {legacy / current:>7.1f}x")
+
+def measure(function, repeat):
+    """Time function, then run it again under tracemalloc for its peak memory.
+
+    Returns (best seconds over repeat runs, peak bytes, result). Tracing slows Python
+    down a lot, so the timed runs are left untraced.
+    """
+    elapsed = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = function()
+        run_time = time.perf_counter() - started_at
+        elapsed = run_time if elapsed is None else min(elapsed, run_time)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def generate_songs(rng, choruses):
+    """Game data songs around the given choruses, with a few songs per artist and some missing previews."""
+    artist_count = len(choruses) // 4 + 1
+    return [{'spotify_id': f"{rng.getrandbits(110):022x}",
+             'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title(),
+             'artist': f"Artist {rng.randrange(artist_count)}",
+             'preview_url': f"https://p.scdn.co/mp3-preview/{rng.getrandbits(160):040x}" if rng.random() < 0.8 else None,
+             'chorus': chorus}
+            for chorus in choruses]
+
+def benchmark_pipeline(rng, size, banned_words, overrides, repeat):
+    """Time each curation and censor stage on a synthetic corpus of size songs.
+
+    Each stage works on the previous stage's output, like the real pipeline.
+    Returns {stage: {'seconds', 'songs_per_second', 'peak_mib'}}.
+    """
+    raw_lyrics = [generate_raw_lyrics(rng, banned_words) for _ in range(size)]
+    normalizer = LyricsNormalizer()
+    engine = get_censor_engine(banned_words, overrides['phrases'])
+    results = {}
+
+    def record(stage, function):
+        seconds, peak, output = measure(function, repeat)
+        results[stage] = {
+            'seconds': seconds,
+            'songs_per_second': size / seconds if seconds else float('inf'),
+            'peak_mib': peak / (1 << 20),
+        }
+        return output
+
+    cleaned = record('clean_up_lyrics', lambda: [normalizer.normalize(lyrics) for lyrics in raw_lyrics])
+    chorus_lines = record('get_chorus', lambda: [find_chorus_lines(lyrics) or [] for lyrics in cleaned])
+    choruses = record('trim_chorus', lambda: [trim_chorus(lines).text for lines in chorus_lines])
+    record('censor_text', lambda: [censor_text(chorus, engine) for chorus in choruses])
+
+    songs = generate_songs(rng, choruses)
+    censored = record('censor_game_data', lambda: censor_game_data(songs, banned_words, phrases=overrides['phrases']))
+    # The same serializations write_game_data does, without the disk write
+    json_content = record('json_serialization', lambda: json.dumps(censored, indent=4, ensure_ascii=False).encode('utf-8'))
+    columnar_content = record('lyrc_serialization', lambda: dump_songs(censored))
+    record('json_parse', lambda: json.loads(json_content))
+    if record('lyrc_parse', lambda: load_songs(columnar_content)) != censored:
+        raise ValueError("Songs changed in the .lyrc round trip")
+    results['json_serialization']['bytes'] = len(json_content)
+    results['lyrc_serialization']['bytes'] = len(columnar_content)
+    return results
+
+def compare_to_baseline(size, results, baseline, tolerance):
+    """Print each stage's results next to the baseline. Returns the stages that regressed."""
+    baseline_results = baseline.get(str(size), {})
+    regressions = []
+
+    print(f"\n=== Pipeline stages, {size:,} songs ===\n")
+    print(f"{'Stage':<20}  {'Seconds':>9}  {'Songs/s':>11}  {'Peak MiB':>9}  {'vs baseline':>12}")
+    for stage, result in results.items():
+        change = ''
+        previous = baseline_results.get(stage)
+        if previous:
+            ratio = result['songs_per_second'] / previous['songs_per_second']
+            change = f"{(ratio - 1) * 100:+.0f}%"
+            if ratio < 1 - tolerance:
+                change += ' SLOWER'
+                regressions.append((size, stage))
+        print(f"{stage:<20}  {result['seconds']:>9.3f}  {result['songs_per_second']:>11,.0f}  "
+              f"{result['peak_mib']:>9.1f}  {change:>12}")
+
+    json_bytes = results['json_serialization']['bytes']
+    columnar_bytes = results['lyrc_serialization']['bytes']
+    print(f"\nSerialized size: JSON {json_bytes:,} bytes, .lyrc {columnar_bytes:,} bytes "
+          f"({(columnar_bytes / json_bytes - 1) * 100:+.0f}%)")
+    return regressions
+
+def load_baseline(file_path):
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def save_baseline(file_path, baseline):
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(baseline, file, indent=4)
+#endregion Functions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Lyricle data pipeline hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=CORPUS_SIZES, help='Corpus sizes for the pipeline stages')
+    parser.add_argument('--songs', type=int, default=200, help='Number of synthetic songs per chorus comparison')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs (the best one is reported)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic lyrics')
+    parser.add_argument('--baseline', default=benchmark_baseline_json, help='Baseline results file')
+    parser.add_argument('--save-baseline', action='store_true', help='Save these results as the new baseline')
+    parser.add_argument('--check', action='store_true', help='Exit with an error if any stage is slower than the baseline allows')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help='Fraction of baseline throughput a stage may lose before it counts as a regression')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    benchmark_chorus(rng, args.songs, args.repeat)
+
+    banned_words = decode_banned_words(load_json_file(banned_words_path)['bannedWordsBase64'])
+    overrides = load_censor_overrides(censor_overrides_path)
+    baseline = load_baseline(args.baseline)
+    regressions = []
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = benchmark_pipeline(random.Random(args.seed), size, banned_words, overrides, args.repeat)
+        regressions += compare_to_baseline(size, results[str(size)], baseline, args.tolerance)
+
+    if args.save_baseline:
+        baseline.update(results)
+        save_baseline(args.baseline, baseline)
+        print(f"\nSaved baseline to {args.baseline}")
+    elif not baseline:
+        print(f"\nNo baseline at {args.baseline} yet; run with --save-baseline to record one.")
+
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) slower than the baseline allows: "
+              + ', '.join(f"{stage} ({size:,} songs)" for size, stage in regressions))
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
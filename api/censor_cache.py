@@ -0,0 +1,76 @@
+'''
+On-disk memo of censored choruses, keyed by a hash of the uncensored chorus.
+
+Used by censor_lyrics.py so that reruns over a mostly unchanged catalog skip the
+per-word replacements. Each entry records a fingerprint of the banned words that
+occur in the chorus (and the phrase replacements), so changing the banned word
+list only invalidates the choruses that contain an added, removed or reordered word.
+'''
+
+import hashlib
+import time
+
+from data_manifest import fingerprint_banned_words
+from sqlite_store import SqliteStore
+
+#region Classes
+class CensorCache(SqliteStore):
+    """SQLite-backed memo of censored choruses with least-recently-used eviction.
+
+    Changes are committed in one go by flush() or close(), since a censor run looks up every song.
+    """
+
+    TABLE = 'censored'
+    KEY = 'chorus_hash'
+    COLUMNS = '''
+        chorus_hash TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        chorus TEXT NOT NULL,
+        accessed_at REAL NOT NULL'''
+    ACCESSED = 'accessed_at'
+
+    def __init__(self, db_path, patterns, max_entries=20000):
+        super().__init__(db_path, max_entries)
+        self.patterns = patterns
+        self.hits = 0
+        self.misses = 0
+
+    def keys(self, text, words):
+        """Hash the uncensored chorus and fingerprint the banned words found in it."""
+        chorus_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return chorus_hash, fingerprint_banned_words(words, self.patterns)
+
+    def get(self, text, words):
+        """Return the censored chorus, or None if it isn't cached for these banned words."""
+        chorus_hash, fingerprint = self.keys(text, words)
+        row = self.row(chorus_hash, 'fingerprint, chorus')
+        if row is None or row[0] != fingerprint:
+            self.misses += 1
+            return None
+
+        self.touch(chorus_hash)
+        self.hits += 1
+        return row[1]
+
+    def put(self, text, words, censored_text):
+        chorus_hash, fingerprint = self.keys(text, words)
+        self.store(chorus_hash=chorus_hash, fingerprint=fingerprint, chorus=censored_text, accessed_at=time.time())
+
+    def stats(self):
+        """Return the hit/miss counters for this run."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': self.count(),
+        }
+
+    def flush(self):
+        """Evict down to max_entries and commit this run's changes."""
+        self.evict()
+        self.connection.commit()
+
+    def close(self):
+        self.flush()
+        super().close()
+#endregion Classes
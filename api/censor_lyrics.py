@@ -1,145 +1,573 @@
 #!/usr/bin/env python3
 import json
 import base64
+import hashlib
 import os
 import re
+import argparse
+import collections
+import concurrent.futures
+
+from censor_cache import CensorCache
+from columnar_data import GameDataWriter, is_columnar, read_game_data, write_game_data
+from data_manifest import fingerprint_banned_words, hash_song, song_key, load_censor_state, save_censor_state
+
+STREAM_READ_SIZE = 1 << 16  # Characters read at a time when streaming a JSON array
+STREAM_BATCH_SIZE = 256  # Songs sent to a worker process at a time
+CENSOR_CACHE_MAX_ENTRIES = 20000  # Censored choruses kept in the memo cache
+censor_cache_db = 'data/censorCache.sqlite'
 
 def load_json_file(file_path):
     """Load and parse a JSON file."""
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
-def save_json_file(file_path, data):
-    """Save data to a JSON file with proper formatting."""
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    with open(file_path, 'w', encoding='utf-8') as file:
-        json.dump(data, file, indent=4, ensure_ascii=False)
+def read_bytes(file_path):
+    """Read a file's raw contents."""
+    with open(file_path, 'rb') as file:
+        return file.read()
 
 def decode_banned_words(base64_words):
     """Decode base64 encoded banned words."""
     return [base64.b64decode(word).decode('utf-8') for word in base64_words]
 
-def censor_text(text, banned_words):
+def load_censor_overrides(file_path):
+    """Load the phrase replacements and per-song chorus overrides.
+
+    Phrase patterns are base64 encoded like the banned words. Returns a dict with
+    'phrases', a list of (pattern, replacement) pairs applied in order, and 'songs',
+    the replacement chorus for each Spotify ID.
+    """
+    overrides = load_json_file(file_path)
+    phrases = []
+    for phrase in overrides.get('phrases', []):
+        pattern = base64.b64decode(phrase['patternBase64']).decode('utf-8')
+        if pattern:
+            phrases.append((pattern, phrase['replacement']))
+    songs = {spotify_id: song['chorus'] for spotify_id, song in overrides.get('songs', {}).items()}
+    return {'phrases': phrases, 'songs': songs}
+
+def is_masking(pattern, replacement):
+    """Whether replacement only turns some of the pattern's characters into asterisks."""
+    return ('*' not in pattern and len(pattern) == len(replacement)
+            and all(a == b or b == '*' for a, b in zip(pattern, replacement)))
+
+def build_trie_pattern(words):
+    """Build a regex alternation from a character trie that prefers the longest word."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def node_pattern(node):
+        branches = [re.escape(char) + node_pattern(child) for char, child in node.items() if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # The word may end here, but keep going greedily if a longer word matches
+            return '(?:' + pattern + ')?'
+        return pattern
+
+    return '(?:' + node_pattern(trie) + ')'
+
+def compile_word_patterns(word_lower):
+    """Compile the replacement patterns for a single banned word."""
+    return {
+        'word': re.compile(r'\b' + re.escape(word_lower) + r'\b', flags=re.IGNORECASE),
+        'line_start': re.compile(r'(^|\n)(' + re.escape(word_lower) + r')', flags=re.IGNORECASE),
+        'prefix': re.compile(r'\b' + re.escape(word_lower) + r'-\w+', flags=re.IGNORECASE),
+        'suffix': re.compile(r'\w+-' + re.escape(word_lower) + r'\b', flags=re.IGNORECASE),
+    }
+
+def replace_prefix(match):
+    """Mask the banned word in a word-xxx match."""
+    text = match.group(0)
+    parts = text.split('-', 1)
+    return '*' * len(parts[0]) + '-' + parts[1]
+
+def replace_suffix(match):
+    """Mask the banned word in an xxx-word match."""
+    text = match.group(0)
+    parts = text.split('-', 1)
+    return parts[0] + '-' + '*' * len(parts[1])
+
+class CensorEngine:
+    """Censor built once from the decoded banned words list and phrase replacements.
+
+    A single scan of the text finds which banned words occur in it at all. Masking can only
+    turn characters into asterisks, so a word that does not occur in the original text can
+    never match later on. Only the words that do occur (usually none) go through the
+    per-word replacements, which keeps the output identical to masking every word in turn.
+    Phrase replacements are found the same way, with their own scan.
+    """
+
+    def __init__(self, banned_words, phrases=()):
+        # Banned list order matters (an earlier word can mask part of a later one),
+        # so duplicates are kept in the replacement order and only dropped for matching
+        self.order = [word.lower() for word in banned_words if word]
+        self.words = list(dict.fromkeys(self.order))
+        self.positions = {word: [] for word in self.words}
+        for i, word in enumerate(self.order):
+            self.positions[word].append(i)
+
+        # For each word, every banned word that is a prefix of it (including itself),
+        # since the scan only reports the longest word found at each position
+        self.prefix_words = {}
+        for word in self.words:
+            self.prefix_words[word] = [word[:end] for end in range(1, len(word) + 1) if word[:end] in self.positions]
+
+        # re's case-insensitive matching treats some letters as equal that lower() doesn't
+        # (e.g. 'I' matches both 'i' and the dotless '\u0131'), so a match is only mapped back
+        # to the banned words by lowercasing it when both are plain ASCII
+        self.ascii_words = all(word.isascii() for word in self.words)
+
+        # Zero-width lookahead so that overlapping occurrences are all reported in one scan
+        self.scan_pattern = re.compile('(?=(' + build_trie_pattern(self.words) + '))', flags=re.IGNORECASE) if self.words else None
+
+        # Replacement patterns for each word, compiled the first time the word shows up
+        self.word_patterns = {}
+
+        # Phrases are replaced in order. When every replacement only masks its phrase, a
+        # phrase missing from the original text can't appear later, so one scan tells
+        # which phrases to replace. Otherwise all of them are applied to every text.
+        self.phrases = list(phrases)
+        self.phrase_scan_pattern = None
+        if self.phrases and all(is_masking(pattern, replacement) for pattern, replacement in self.phrases):
+            patterns = list(dict.fromkeys(pattern for pattern, _ in self.phrases))
+            self.phrase_prefixes = {pattern: [prefix for prefix in patterns if pattern.startswith(prefix)]
+                                    for pattern in patterns}
+            self.phrase_scan_pattern = re.compile('(?=(' + build_trie_pattern(patterns) + '))')
+
+    def get_word_patterns(self, word):
+        """Get the compiled replacement patterns for a banned word."""
+        patterns = self.word_patterns.get(word)
+        if patterns is None:
+            patterns = compile_word_patterns(word)
+            self.word_patterns[word] = patterns
+        return patterns
+
+    def find_words(self, text):
+        """Return the banned words that occur anywhere in the text, in banned list order."""
+        found = set()
+        for match in self.scan_pattern.finditer(text):
+            word = match.group(1)
+            prefixes = self.prefix_words.get(word.lower()) if self.ascii_words and word.isascii() else None
+            if prefixes is None:
+                # The match can't be mapped back by lowercasing, so fall back to checking every word
+                return self.order
+            found.update(prefixes)
+        return [self.order[i] for i in sorted(i for word in found for i in self.positions[word])]
+
+    def replace_phrases(self, text):
+        """Apply the phrase replacements that can match the text, in order."""
+        phrases = self.phrases
+        if self.phrase_scan_pattern is not None:
+            found = set()
+            for match in self.phrase_scan_pattern.finditer(text):
+                found.update(self.phrase_prefixes[match.group(1)])
+            if not found:
+                return text
+            phrases = [phrase for phrase in phrases if phrase[0] in found]
+
+        for pattern, replacement in phrases:
+            text = text.replace(pattern, replacement)
+        return text
+
+    def censor(self, text, cache=None):
+        """Replace banned words with asterisks.
+
+        If a CensorCache is given, choruses it already holds for the same banned words
+        are returned from it, and newly censored ones are added to it.
+        """
+        if not text:
+            return text
+
+        # Apply phrase replacements first
+        censored_text = self.replace_phrases(text)
+
+        if self.scan_pattern is None:
+            return censored_text
+
+        words = self.find_words(censored_text)
+        if not words:
+            return censored_text
+
+        if cache is not None:
+            cached_text = cache.get(text, words)
+            if cached_text is not None:
+                return cached_text
+
+        # Process each banned word found in the text
+        for word in words:
+            patterns = self.get_word_patterns(word)
+            mask = '*' * len(word)
+
+            # Simple case: exact word match with word boundaries
+            censored_text = patterns['word'].sub(mask, censored_text)
+
+            # Replace the word at the beginning of lines
+            censored_text = patterns['line_start'].sub(lambda match: match.group(1) + mask, censored_text)
+
+        # Handle hyphenated combinations separately
+        for word in words:
+            patterns = self.get_word_patterns(word)
+
+            # For word-xxx pattern
+            censored_text = patterns['prefix'].sub(replace_prefix, censored_text)
+
+            # For xxx-word pattern
+            censored_text = patterns['suffix'].sub(replace_suffix, censored_text)
+
+        if cache is not None:
+            cache.put(text, words, censored_text)
+        return censored_text
+
+_censor_engines = {}
+
+def get_censor_engine(banned_words, phrases=()):
+    """Get the compiled censor engine for a banned words list, building it only once."""
+    key = (tuple(banned_words), tuple(phrases))
+    engine = _censor_engines.get(key)
+    if engine is None:
+        engine = CensorEngine(banned_words, phrases)
+        _censor_engines[key] = engine
+    return engine
+
+def censor_text(text, banned_words, cache=None, phrases=()):
     """Replace banned words with asterisks."""
     if not text:
         return text
-        
-    censored_text = text
-    
-    # Hard-coded replacements for specific problematic cases
-    specific_patterns = {
-        "Yeah, bitch,": "Yeah, *****,",
-        "Yeah, bitch": "Yeah, *****",
-        "Bitch, I said": "*****, I said",
-        "bitch, I said": "*****, I said",
-        "little bitch-ass": "little *****-***",
-        "that bitch like": "that ***** like",
-        "pass that bitch": "pass that *****",
-        "bitch like Stockton": "***** like Stockton",
-        "your little bitch": "your little *****"
-    }
-    
-    # Apply specific replacements first
-    for pattern, replacement in specific_patterns.items():
-        censored_text = censored_text.replace(pattern, replacement)
-    
-    # Process each banned word
-    for word in banned_words:
-        word_lower = word.lower()
-        
-        # Simple case: exact word match with word boundaries
-        pattern = r'\b' + re.escape(word_lower) + r'\b'
-        censored_text = re.sub(pattern, '*' * len(word_lower), censored_text, flags=re.IGNORECASE)
-        
-        # Replace the word at the beginning of lines
-        line_start_pattern = r'(^|\n)(' + re.escape(word_lower) + r')'
-        censored_text = re.sub(line_start_pattern, r'\1' + '*' * len(word_lower), censored_text, flags=re.IGNORECASE)
-    
-    # Handle hyphenated combinations separately
-    for word in banned_words:
-        word_lower = word.lower()
-        
-        # For word-xxx pattern
-        prefix_pattern = r'\b' + re.escape(word_lower) + r'-\w+'
-        
-        def replace_prefix(match):
-            text = match.group(0)
-            parts = text.split('-', 1)
-            return '*' * len(parts[0]) + '-' + parts[1]
-        
-        censored_text = re.sub(prefix_pattern, replace_prefix, censored_text, flags=re.IGNORECASE)
-        
-        # For xxx-word pattern
-        suffix_pattern = r'\w+-' + re.escape(word_lower) + r'\b'
-        
-        def replace_suffix(match):
-            text = match.group(0)
-            parts = text.split('-', 1)
-            return parts[0] + '-' + '*' * len(parts[1])
-        
-        censored_text = re.sub(suffix_pattern, replace_suffix, censored_text, flags=re.IGNORECASE)
-    
-    return censored_text
 
-def censor_game_data(uncensored_data, banned_words):
-    """Censor all instances of banned words in the game data."""
+    engine = banned_words if isinstance(banned_words, CensorEngine) else get_censor_engine(banned_words, phrases)
+    return engine.censor(text, cache)
+
+def censor_game_data(uncensored_data, banned_words, reusable_songs=None, cache=None, phrases=()):
+    """Censor all instances of banned words in the game data.
+
+    Songs found in reusable_songs (previously censored songs by Spotify ID) are copied
+    from there instead of being censored again, and choruses found in the cache are
+    taken from it.
+    """
     censored_data = []
+    reusable_songs = reusable_songs or {}
+
+    # Build the censor engine once for the whole data set
+    engine = get_censor_engine(banned_words, phrases)
     
     for song in uncensored_data:
+        previous_song = reusable_songs.get(song_key(song))
+        if previous_song is not None:
+            censored_data.append(previous_song.copy())
+            continue
+
         # Create a copy of the song
         censored_song = song.copy()
         
         # Censor the chorus
-        censored_song['chorus'] = censor_text(song['chorus'], banned_words)
+        censored_song['chorus'] = censor_text(song['chorus'], engine, cache)
         
         # Add to censored data
         censored_data.append(censored_song)
     
     return censored_data
 
-def manual_censor_specific_songs(censored_data):
+def find_reusable_songs(uncensored_data, output_path, fingerprint):
+    """Return the songs in the previous output, by Spotify ID, that can be reused as is.
+
+    A song can be reused when neither the uncensored song nor the banned word list (and
+    censor overrides) have changed since the censor step last wrote output_path.
+    """
+    state = load_censor_state()
+    if (not state or state.get('output') != output_path or state.get('banned_words') != fingerprint
+            or output_path.endswith('.jsonl') or not os.path.exists(output_path)):
+        return {}
+
+    previous_hashes = state.get('songs', {})
+    unchanged = {song_key(song) for song in uncensored_data if previous_hashes.get(song_key(song)) == hash_song(song)}
+    return {song_key(song): song for song in read_game_data(output_path) if song_key(song) in unchanged}
+
+def manual_censor_song(song, song_overrides):
+    """Replace the chorus of a song that needs special handling, if it has an override."""
+    chorus = song_overrides.get(song['spotify_id'])
+    if chorus is not None:
+        song['chorus'] = chorus
+    return song
+
+def manual_censor_specific_songs(censored_data, song_overrides):
     """Manually censor specific songs that need special handling."""
     for song in censored_data:
-        # Paint The Town Red by Doja Cat
-        if song['spotify_id'] == '56y1jOTK0XSvJzVv9vHQBK':
-            song['chorus'] = "Yeah, *****, I said what I said\nI'd rather be famous instead\nI let all that get to my head\nI don't care, I paint the town red\n*****, I said what I said\nI'd rather be famous instead\nI let all that get to my head"
-        
-        # WHATS POPPIN by Jack Harlow
-        elif song['spotify_id'] == '1jaTQ3nqY3oAAYyCTbIvnM':
-            song['chorus'] = "What's poppin'? \nBrand new whip, just hopped in \nI got options \nI could pass that ***** like Stockton \nJust joshin'\nI'ma spend this holiday locked in \nMy body got rid of them toxins \nSportsCenter, top ten"
-        
-        # Busy Woman by Sabrina Carpenter
-        elif song['spotify_id'] == '0b0Dz0Gi86SVdBxYeiQcCP':
-            song['chorus'] = "But if you need my love\nMy clothes are off, I'm comin' over to your place\nAnd if you don't need  my love\nWell, I didn't want your little *****-*** anyway\nYeah, I'm a busy woman\nI wouldn't let you come into my calendar any night"
+        manual_censor_song(song, song_overrides)
     
     return censored_data
 
+#region Streaming
+def is_json_lines(file_path):
+    """Check whether a file holds JSON Lines rather than a single JSON array."""
+    if file_path.endswith('.jsonl'):
+        return True
+    with open(file_path, 'r', encoding='utf-8') as file:
+        while True:
+            char = file.read(1)
+            if not char or not char.isspace():
+                return char != '['
+
+def iter_json_array(file, chunk_size=STREAM_READ_SIZE):
+    """Yield the items of a JSON array one at a time without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between items
+        while position < len(buffer) and (buffer[position].isspace() or (started and buffer[position] == ',')):
+            position += 1
+
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError("Expected a JSON array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The item is cut off at the end of the buffer, so read more unless we're done
+                if eof:
+                    raise
+            else:
+                yield item
+                position = end
+                continue
+        elif eof:
+            raise ValueError("Unexpected end of JSON array")
+
+        # Drop what has been consumed and read the next chunk
+        chunk = file.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        eof = not chunk
+
+def iter_songs(file_path):
+    """Yield songs one at a time from a JSON array, JSON Lines or .lyrc file."""
+    if is_columnar(file_path):
+        # Columns have to be read whole, so the songs are loaded up front
+        yield from read_game_data(file_path)
+    elif is_json_lines(file_path):
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            yield from iter_json_array(file)
+
+_worker_engine = None
+_worker_song_overrides = {}
+
+def init_censor_worker(banned_words, overrides):
+    """Build the censor engine once in each worker process."""
+    global _worker_engine, _worker_song_overrides
+    _worker_engine = get_censor_engine(banned_words, overrides['phrases'])
+    _worker_song_overrides = overrides['songs']
+
+def censor_song_batch(songs):
+    """Censor a batch of songs in a worker process."""
+    censored_songs = []
+    for song in songs:
+        censored_song = song.copy()
+        censored_song['chorus'] = censor_text(song['chorus'], _worker_engine)
+        censored_songs.append(manual_censor_song(censored_song, _worker_song_overrides))
+    return censored_songs
+
+def iter_batches(songs, batch_size):
+    """Group songs into lists of batch_size."""
+    batch = []
+    for song in songs:
+        batch.append(song)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class DailyShardWriter:
+    """Write each song to its own compact file, named by its daily rotation index.
+
+    The game picks the song at index (day % song count), so alongside the shards a tiny
+    index.json manifest records the song count and a version hash. A player then only
+    needs the manifest and a single shard instead of the whole gameData.json.
+    """
+
+    def __init__(self, shard_dir):
+        self.shard_dir = shard_dir
+        os.makedirs(shard_dir, exist_ok=True)
+        self.count = 0
+        self.written = 0
+        self.version = hashlib.sha256()
+
+    def write(self, song):
+        content = json.dumps(song, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        self.version.update(content)
+        self.version.update(b'\n')
+
+        # Leave shards that didn't change alone so they don't need to be uploaded again
+        shard_path = os.path.join(self.shard_dir, f"{self.count}.json")
+        if not os.path.exists(shard_path) or read_bytes(shard_path) != content:
+            with open(shard_path, 'wb') as file:
+                file.write(content)
+            self.written += 1
+        self.count += 1
+
+    def close(self):
+        # Remove shards left over from a previous, larger catalog
+        index = self.count
+        while os.path.exists(os.path.join(self.shard_dir, f"{index}.json")):
+            os.remove(os.path.join(self.shard_dir, f"{index}.json"))
+            index += 1
+
+        manifest = {'count': self.count, 'version': self.version.hexdigest()[:16]}
+        with open(os.path.join(self.shard_dir, 'index.json'), 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, separators=(',', ':'))
+
+def save_daily_shards(shard_dir, censored_data):
+    """Save one compact file per song plus an index.json manifest."""
+    writer = DailyShardWriter(shard_dir)
+    for song in censored_data:
+        writer.write(song)
+    writer.close()
+    return writer
+
+def censor_game_data_streaming(input_path, output_path, banned_words, overrides, workers=None, batch_size=STREAM_BATCH_SIZE,
+                               shard_dir=None):
+    """Censor songs from input_path into output_path using a process pool.
+
+    Songs are read, censored and written in batches, and only a bounded number of batches
+    are in flight at once, so memory use stays flat no matter how large the catalog is.
+    Output keeps the original order. Returns the number of songs written.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+    writer = GameDataWriter(output_path)
+    shard_writer = DailyShardWriter(shard_dir) if shard_dir else None
+
+    def write(song):
+        writer.write(song)
+        if shard_writer:
+            shard_writer.write(song)
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_censor_worker,
+                                                    initargs=(banned_words, overrides)) as executor:
+            pending = collections.deque()
+            for batch in iter_batches(iter_songs(input_path), batch_size):
+                pending.append(executor.submit(censor_song_batch, batch))
+
+                # Write finished batches in order before reading further ahead
+                while len(pending) >= max_pending:
+                    for song in pending.popleft().result():
+                        write(song)
+
+            while pending:
+                for song in pending.popleft().result():
+                    write(song)
+    except BaseException:
+        writer.discard()
+        raise
+    writer.close()
+
+    if shard_writer:
+        shard_writer.close()
+
+    return writer.count
+#endregion Streaming
+
 def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description='Censor curated data for Lyricle game')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream songs through a process pool instead of loading them all into memory')
+    parser.add_argument('--input', default='data/uncensoredGameData.json',
+                        help='Uncensored data file (JSON array, .lyrc, or JSON Lines when streaming)')
+    parser.add_argument('--output', default='data/gameData.json',
+                        help='Censored data file (.lyrc for the columnar format, or JSON Lines when streaming to a .jsonl file)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes when streaming (defaults to all cores)')
+    parser.add_argument('--shard-dir', default='data/daily',
+                        help='Directory for the per-day song files and their index.json manifest')
+    parser.add_argument('--no-shards', action='store_true',
+                        help='Only write the censored data file, not the per-day song files')
+    parser.add_argument('--no-censor-cache', action='store_true',
+                        help='Censor every chorus again instead of using the censored chorus cache')
+    parser.add_argument('--censor-cache-size', type=int, default=CENSOR_CACHE_MAX_ENTRIES,
+                        help='Maximum number of censored choruses to keep in the cache')
+    args = parser.parse_args()
+    if args.stream and is_columnar(args.output):
+        parser.error('--stream writes songs as they finish, so it can only write JSON or JSON Lines')
+
     # File paths
     banned_words_path = 'api/bannedWords.json'
-    uncensored_data_path = 'data/uncensoredGameData.json'
-    censored_data_path = 'data/gameData.json'
+    censor_overrides_path = 'api/censorOverrides.json'
+    uncensored_data_path = args.input
+    censored_data_path = args.output
+    shard_dir = None if args.no_shards else args.shard_dir
     
     # Load banned words and decode from base64
     banned_words_data = load_json_file(banned_words_path)
     banned_words = decode_banned_words(banned_words_data['bannedWordsBase64'])
+
+    # Load the phrase replacements and per-song chorus overrides
+    overrides = load_censor_overrides(censor_overrides_path)
+    fingerprint = fingerprint_banned_words(banned_words, overrides)
+
+    if args.stream:
+        song_count = censor_game_data_streaming(uncensored_data_path, censored_data_path, banned_words, overrides, args.workers,
+                                                shard_dir=shard_dir)
+        # Per-song hashes would grow with the catalog, so none are kept when streaming, and
+        # any from an earlier run no longer describe the output (the next full run censors every song)
+        save_censor_state(censored_data_path, fingerprint, {})
+        print(f"Censored {len(banned_words)} banned words in {song_count} songs.")
+        print(f"Saved censored data to {censored_data_path}")
+        if shard_dir:
+            print(f"Saved {song_count} per-day song files to {shard_dir}")
+        return
     
     # Load uncensored game data
-    uncensored_data = load_json_file(uncensored_data_path)
+    uncensored_data = read_game_data(uncensored_data_path)
     
-    # Censor the game data
-    censored_data = censor_game_data(uncensored_data, banned_words)
+    # Censor the game data, reusing songs that haven't changed since the last run
+    reusable_songs = find_reusable_songs(uncensored_data, censored_data_path, fingerprint)
+    censor_cache = None if args.no_censor_cache else CensorCache(censor_cache_db, overrides['phrases'], args.censor_cache_size)
+    censored_data = censor_game_data(uncensored_data, banned_words, reusable_songs, censor_cache, overrides['phrases'])
+    if censor_cache:
+        censor_cache.flush()
+        cache_stats = censor_cache.stats()
+        censor_cache.close()
+        print(f"Censor cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{cache_stats['evictions']} evicted, {cache_stats['entries']} entries")
     
     # Apply manual censoring for specific problematic songs
-    censored_data = manual_censor_specific_songs(censored_data)
+    censored_data = manual_censor_specific_songs(censored_data, overrides['songs'])
     
     # Save censored data to gameData.json
-    save_json_file(censored_data_path, censored_data)
+    write_game_data(censored_data_path, censored_data)
+    save_censor_state(censored_data_path, fingerprint, {song_key(song): hash_song(song) for song in uncensored_data})
+    
+    # Save one small file per daily song for the client to fetch
+    if shard_dir:
+        shard_writer = save_daily_shards(shard_dir, censored_data)
     
-    print(f"Censored {len(banned_words)} banned words in {len(uncensored_data)} songs.")
+    print(f"Censored {len(banned_words)} banned words in {len(uncensored_data)} songs ({len(reusable_songs)} unchanged songs reused).")
     print(f"Saved censored data to {censored_data_path}")
+    if shard_dir:
+        print(f"Saved {shard_writer.count} per-day song files to {shard_dir} ({shard_writer.written} changed)")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
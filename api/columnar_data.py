@@ -0,0 +1,256 @@
+'''
+To run:
+python api/columnar_data.py data/gameData.json data/gameData.lyrc   # Convert (either direction) and compare
+
+Compact columnar format for game data (`.lyrc` files).
+
+The JSON game data repeats the keys spotify_id, title, artist, preview_url and chorus
+in every song. A .lyrc file stores each key once, as a column. Each column holds its
+distinct values once, as one UTF-8 blob plus an array of lengths, so repeated values
+(e.g. an artist with many songs) are only stored once, with an index per song into
+them. Loading decodes each blob in a single call and slices it, instead of parsing
+every string separately.
+
+Layout (all integers little-endian):
+    b'LYRC', version (u8), song count (u32), column count (u16)
+    per column:
+        name length (u16), name (UTF-8)
+        distinct value count (u32), index of the null value (i32, -1 if none)
+        value lengths in characters (u32 each, 0 for null)
+        blob length in bytes (u32), blob (UTF-8)
+        indexed flag (u8), then one index (u32) per song if set
+'''
+
+import argparse
+import gzip
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from itertools import accumulate, repeat
+
+#region Global Variable Declarations
+MAGIC = b'LYRC'
+FORMAT_VERSION = 1
+COLUMNAR_EXTENSION = '.lyrc'
+NO_NULL = -1  # Null value index of a column without nulls
+JSON_LINES_EXTENSION = '.jsonl'
+#endregion Global Variable Declarations
+
+#region Classes
+class GameDataWriter:
+    """Writes songs to a game data file one at a time, as they arrive.
+
+    JSON is written with the same layout json.dump(..., indent=4) gives the whole list, and
+    a .jsonl file gets one compact song per line. Either goes to a temporary file that
+    replaces the game data file on close, so an interrupted run leaves the previous file
+    intact. The columnar .lyrc format can't be appended to, so it is written in one go on close.
+    """
+
+    def __init__(self, file_path, ensure_ascii=False):
+        self.file_path = file_path
+        self.temp_path = file_path + '.tmp'
+        self.ensure_ascii = ensure_ascii
+        self.json_lines = file_path.endswith(JSON_LINES_EXTENSION)
+        self.count = 0
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.columnar_songs = [] if is_columnar(file_path) else None
+        self.file = None if is_columnar(file_path) else open(self.temp_path, 'w', encoding='utf-8')
+
+    def write(self, song):
+        if self.columnar_songs is not None:
+            self.columnar_songs.append(song)
+        elif self.json_lines:
+            self.file.write(json.dumps(song, ensure_ascii=self.ensure_ascii) + '\n')
+        else:
+            item = json.dumps(song, indent=4, ensure_ascii=self.ensure_ascii).replace('\n', '\n    ')
+            self.file.write(('[\n    ' if self.count == 0 else ',\n    ') + item)
+        self.count += 1
+
+    def close(self):
+        if self.columnar_songs is not None:
+            write_game_data(self.file_path, self.columnar_songs)
+            return
+        if not self.json_lines:
+            self.file.write('\n]' if self.count else '[]')
+        self.file.close()
+        os.replace(self.temp_path, self.file_path)
+
+    def discard(self):
+        """Stop without touching the game data file, e.g. after an error."""
+        if self.file:
+            self.file.close()
+            os.remove(self.temp_path)
+#endregion Classes
+
+#region Functions
+def little_endian(values):
+    """Return an array's bytes in little-endian order."""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def read_array(typecode, content, offset, count):
+    """Read count little-endian items of typecode from content at offset. Returns (array, new offset)."""
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    values.frombytes(content[offset:end])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, end
+
+def dump_songs(songs):
+    """Serialize a list of song dicts (all with the same keys) to .lyrc bytes."""
+    columns = list(songs[0]) if songs else []
+    for song in songs:
+        if song.keys() != songs[0].keys():
+            raise ValueError(f"Song {song.get('spotify_id')} doesn't have the same keys as the first song")
+    parts = [MAGIC, struct.pack('<BIH', FORMAT_VERSION, len(songs), len(columns))]
+
+    for column in columns:
+        # Each distinct value is stored once, in order of first appearance
+        distinct = {}
+        indexes = array('I', (distinct.setdefault(song[column], len(distinct)) for song in songs))
+
+        values = list(distinct)
+        if any(value is not None and not isinstance(value, str) for value in values):
+            raise ValueError(f"Column {column} holds values other than strings and nulls")
+        null_index = distinct.get(None, NO_NULL)
+        lengths = array('I', (0 if value is None else len(value) for value in values))
+        blob = ''.join(value for value in values if value is not None).encode('utf-8')
+
+        name = column.encode('utf-8')
+        parts += [struct.pack('<H', len(name)), name, struct.pack('<Ii', len(values), null_index), little_endian(lengths),
+                  struct.pack('<I', len(blob)), blob]
+        # Columns without repeats (e.g. spotify_id) don't need an index per song
+        indexed = len(values) < len(songs)
+        parts.append(struct.pack('<B', indexed))
+        if indexed:
+            parts.append(little_endian(indexes))
+
+    return b''.join(parts)
+
+def load_songs(content):
+    """Parse .lyrc bytes back into a list of song dicts."""
+    if content[:4] != MAGIC:
+        raise ValueError("Not a .lyrc file")
+    version, song_count, column_count = struct.unpack_from('<BIH', content, 4)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported .lyrc version {version}")
+    offset = 4 + struct.calcsize('<BIH')
+
+    names = []
+    columns = []
+    for _ in range(column_count):
+        (name_length,) = struct.unpack_from('<H', content, offset)
+        offset += 2
+        names.append(content[offset:offset + name_length].decode('utf-8'))
+        offset += name_length
+
+        value_count, null_index = struct.unpack_from('<Ii', content, offset)
+        lengths, offset = read_array('I', content, offset + 8, value_count)
+        (blob_length,) = struct.unpack_from('<I', content, offset)
+        offset += 4
+        blob = content[offset:offset + blob_length].decode('utf-8')
+        offset += blob_length
+
+        # Slice every value out of the decoded blob by its character offsets
+        ends = list(accumulate(lengths))
+        values = [blob[start:end] for start, end in zip([0, *ends], ends)]
+        if null_index != NO_NULL:
+            values[null_index] = None
+
+        indexed = content[offset]
+        offset += 1
+        if indexed:
+            indexes, offset = read_array('I', content, offset, song_count)
+            values = list(map(values.__getitem__, indexes))
+        columns.append(values)
+
+    if not columns:
+        return [{} for _ in range(song_count)]
+    return list(map(dict, map(zip, repeat(names), zip(*columns))))
+
+def is_columnar(file_path):
+    return file_path.endswith(COLUMNAR_EXTENSION)
+
+def read_game_data(file_path):
+    """Load game data from a .lyrc file or a JSON file."""
+    if is_columnar(file_path):
+        with open(file_path, 'rb') as file:
+            return load_songs(file.read())
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def write_game_data(file_path, songs):
+    """Save game data as a .lyrc file, or as indented JSON for any other extension."""
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if is_columnar(file_path):
+        with open(file_path, 'wb') as file:
+            file.write(dump_songs(songs))
+        return
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(songs, file, indent=4, ensure_ascii=False)
+
+def best_time(function, repeat):
+    elapsed = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        run_time = time.perf_counter() - started_at
+        elapsed = run_time if elapsed is None else min(elapsed, run_time)
+    return elapsed
+
+def compare_formats(songs, repeat=5):
+    """Check that songs survive a .lyrc round trip, and compare its size and load time with JSON.
+
+    Returns {format: {'bytes', 'gzip_bytes', 'load_seconds'}}.
+    """
+    json_content = json.dumps(songs, indent=4, ensure_ascii=False).encode('utf-8')
+    columnar_content = dump_songs(songs)
+    if load_songs(columnar_content) != songs:
+        raise ValueError("Songs changed in the .lyrc round trip")
+
+    return {
+        'json': {
+            'bytes': len(json_content),
+            'gzip_bytes': len(gzip.compress(json_content, mtime=0)),
+            'load_seconds': best_time(lambda: json.loads(json_content), repeat),
+        },
+        'lyrc': {
+            'bytes': len(columnar_content),
+            'gzip_bytes': len(gzip.compress(columnar_content, mtime=0)),
+            'load_seconds': best_time(lambda: load_songs(columnar_content), repeat),
+        },
+    }
+
+def print_comparison(comparison, song_count):
+    print(f"\n=== JSON vs .lyrc, {song_count:,} songs (round trip OK) ===\n")
+    print(f"{'Format':<6}  {'Bytes':>12}  {'Gzip bytes':>12}  {'Load ms':>9}")
+    for name, result in comparison.items():
+        print(f"{name:<6}  {result['bytes']:>12,}  {result['gzip_bytes']:>12,}  {result['load_seconds'] * 1000:>9.1f}")
+#endregion Functions
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert game data between JSON and the columnar .lyrc format')
+    parser.add_argument('input', help='Game data file to read (.json or .lyrc)')
+    parser.add_argument('output', nargs='?', help='File to write (.lyrc for the columnar format, anything else for JSON)')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed loads (the best one is reported)')
+    args = parser.parse_args()
+
+    songs = read_game_data(args.input)
+    print_comparison(compare_formats(songs, args.repeat), len(songs))
+
+    if args.output:
+        write_game_data(args.output, songs)
+        print(f"\nSaved {len(songs)} songs to {args.output}")
+
+if __name__ == "__main__":
+    main()
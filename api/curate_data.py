@@ -14,12 +14,24 @@ import subprocess
 import sys
 from dotenv import load_dotenv
 import lyricsgenius
-import re
 import requests
 from time import sleep
+import asyncio
 import concurrent.futures
 from threading import Lock
 import argparse
+from lyrics_cache import LyricsCache
+from curation_journal import CurationJournal
+from rate_limiter import AdaptiveRateLimiter, RateLimitedSession
+from genius_index import GeniusIndex, clean_title, normalize_key, normalize_title
+from rejection_ledger import RejectionLedger
+from columnar_data import GameDataWriter, read_game_data
+from http_sessions import HttpCache, create_pooled_session, mount_pooled_adapter, spotify_retry
+from preview_workers import PreviewWorkerPool
+from fake_services import redirect_to_fake_services, fake_preview_command
+from run_metrics import RunMetrics
+from curation_engine import AsyncCurationEngine, PipelineStage
+from lyrics_processing import LyricsNormalizer, find_chorus_lines, trim_chorus, CHORUS_MAX_WORDS, CHORUS_MIN_UNIQUE_WORDS
 
 #region Global Variable Declarations
 spotify_client_id_filename = 'secrets/spotify_client_id.key'
@@ -28,19 +40,81 @@ genius_client_access_token_filename = 'secrets/genius_client_access_token.key'
 top_songs_json = 'data/topSongs.json'
 game_data_json = 'data/uncensoredGameData.json'
 node_script_path = 'api/get_preview_url.js'
+top_songs_playlist_id = '58zw0vG0X5GdT82of2G22L'  # ID of the public playlist of Spotify's most streamed songs
+lyrics_cache_db = 'data/lyricsCache.sqlite'
+http_cache_db = 'data/httpCache.sqlite'
+genius_index_db = 'data/geniusIndex.sqlite'
+rejection_ledger_db = 'data/rejectionLedger.sqlite'
+curation_journal_jsonl = 'data/curationJournal.jsonl'
+curation_report_json = 'data/curationReport.json'
+LYRICS_CACHE_TTL_DAYS = 30  # Days before cached Genius lyrics are fetched again
+LYRICS_CACHE_MAX_ENTRIES = 5000  # Max number of tracks kept in the lyrics cache
+REJECTION_TTL_DAYS = 30  # Days before a skipped track is given another chance
+HTTP_CACHE_MAX_ENTRIES = 5000  # Max number of Spotify and Genius API responses kept for conditional requests
 MAX_WORKERS = 8  # Max number of parallel threads
+PLAYLIST_PAGE_WORKERS = 4  # Max number of playlist pages fetched at once
+PREVIEW_NODE_WORKERS = 2  # Long-lived Node.js processes for preview URLs (0 to start one per track)
+PREVIEW_TIMEOUT = 30  # Seconds to wait for a single preview URL
+preview_worker_pool = None  # Set while fetching songs if Node.js workers are used
+preview_command = ["node", node_script_path]  # Command that looks up a preview URL (replaced when using fake services)
+http_cache = None  # Cached API responses revalidated with ETag / If-Modified-Since (set in main)
+rejection_ledger = None  # Tracks skipped in earlier runs and why (set in main)
+genius_index = None  # Genius song IDs that tracks were resolved to before (set in main)
+fake_services_url = None  # Base URL of local stand-ins for Spotify, Genius and preview lookups (see fake_services.py)
+GENIUS_WORKERS = 4  # Max number of concurrent Genius lookups
+GENIUS_INITIAL_RATE = 2.0  # Genius requests per second to start at before adapting
 print_lock = Lock()  # Lock for thread-safe printing
+lyrics_normalizer = LyricsNormalizer()  # Replaced in main if extra character folding rules are given
+run_metrics = RunMetrics()  # Stage timings, request latencies and counters for the run report
 #endregion Global Variable Declarations
 
 #region Classes
+class GeniusLookupFailed(Exception):
+    """Raised when a Genius lookup keeps failing, as opposed to finding no song"""
+
 # Define a class to represent a song (with lyrics)
 class Song:
+    # Slots keep each song small, without a per-instance __dict__
+    __slots__ = ('spotify_id', 'title', 'artist', 'preview_url', 'chorus')
+
     def __init__(self, spotify_id, title, artist, preview_url, chorus):
         self.spotify_id = spotify_id
         self.title = title
         self.artist = artist
         self.preview_url = preview_url
         self.chorus = chorus
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+class TrackDeduplicator:
+    """Keeps the first occurrence of each song across playlists.
+
+    Tracks are the same song if they share a Spotify ID, or a normalized title and
+    artist (e.g. a single and its album version, or a remaster).
+    """
+
+    def __init__(self):
+        self.ids = set()
+        self.keys = set()
+        self.tracks = 0
+        self.duplicates = 0
+
+    def add(self, track):
+        """Return True if track is a song that hasn't been seen yet."""
+        self.tracks += 1
+        key = normalize_key(track['title'], track['artist'])
+        if track['id'] in self.ids or key in self.keys:
+            self.duplicates += 1
+            return False
+        self.ids.add(track['id'])
+        self.keys.add(key)
+        return True
+
+    def report(self, playlist_count):
+        print(f"Found {self.tracks - self.duplicates} unique songs in {self.tracks} tracks from {playlist_count} playlists "
+              f"({self.duplicates} duplicates)")
+        run_metrics.set('playlists', {'sources': playlist_count, 'tracks': self.tracks, 'duplicates': self.duplicates})
 #endregion Classes
 
 #region Functions
@@ -117,27 +191,51 @@ def create_node_script():
 require('dotenv').config();
 const spotifyPreviewFinder = require('spotify-preview-finder');
 
-// Get song name and artist from command line arguments
-const songQuery = process.argv[2];
-
-async function getPreviewUrl() {
+// Find the preview URL for a search query, or an empty string if there isn't one
+async function findPreviewUrl(songQuery) {
   try {
     const result = await spotifyPreviewFinder(songQuery, 1);
     
     if (result.success && result.results.length > 0) {
       // Return the first preview URL
-      const previewUrl = result.results[0].previewUrls[0];
-      console.log(previewUrl);
-    } else {
-      console.log('');  // Empty string if no preview URL found
+      return result.results[0].previewUrls[0] || '';
     }
+    return '';  // Empty string if no preview URL found
   } catch (error) {
     console.error(error.message);
-    console.log('');  // Empty string on error
+    return '';  // Empty string on error
   }
 }
 
-getPreviewUrl();
+// Get song name and artist from command line arguments
+async function getPreviewUrl(songQuery) {
+  console.log(await findPreviewUrl(songQuery));
+}
+
+// Worker mode: answer many queries over stdin/stdout, one JSON object per line
+// Request: {"id": 1, "query": "Song Artist"}  Response: {"id": 1, "preview_url": "..."}
+function runWorker() {
+  const readline = require('readline');
+  const lines = readline.createInterface({ input: process.stdin });
+
+  lines.on('line', async (line) => {
+    let request;
+    try {
+      request = JSON.parse(line);
+    } catch (error) {
+      console.error(`Invalid request: ${line}`);
+      return;
+    }
+    const previewUrl = await findPreviewUrl(request.query);
+    process.stdout.write(JSON.stringify({ id: request.id, preview_url: previewUrl }) + '\\n');
+  });
+}
+
+if (process.argv[2] === '--worker') {
+  runWorker();
+} else {
+  getPreviewUrl(process.argv[2]);
+}
 '''
     
     with open(node_script_path, 'w') as f:
@@ -162,12 +260,23 @@ def get_preview_url_with_spotify_preview_finder(track_name, track_artist):
         # Create a search query combining the track name and artist
         search_query = f"{track_name} {track_artist}"
         
-        # Run the Node.js script to get the preview URL
-        cmd = ["node", node_script_path, search_query]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        # The output should be the preview URL or an empty string
-        preview_url = result.stdout.strip()
+        if preview_worker_pool:
+            # Ask one of the long-lived Node.js workers
+            with run_metrics.timed('preview_lookup'):
+                preview_url = preview_worker_pool.get_preview_url(search_query)
+            if preview_url is None:
+                run_metrics.increment('preview_failures')
+                with print_lock:
+                    print(f"Preview worker did not answer for track {track_name}")
+                return None
+        else:
+            # Run the Node.js script to get the preview URL
+            cmd = preview_command + [search_query]
+            with run_metrics.timed('preview_lookup'):
+                result = subprocess.run(cmd, capture_output=True, text=True)
+            
+            # The output should be the preview URL or an empty string
+            preview_url = result.stdout.strip()
         
         with print_lock:
             if preview_url:
@@ -202,23 +311,40 @@ def process_track_preview(track):
             print(f"An error occurred while fetching preview URL for {track['title']} by {track['artist']}: {e}")
         return track
 
-def update_preview_urls_with_spotify_preview_finder(all_tracks):
-    """Update preview URLs for all tracks using spotify-preview-finder with multithreading"""
-    with print_lock:
-        print(f"\nUpdating preview URLs using {MAX_WORKERS} parallel threads...")
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # Submit all tasks and collect futures
-        future_to_track = {executor.submit(process_track_preview, track): track for track in all_tracks}
+def start_preview_lookups(spotify_client_id, spotify_client_secret, preview_workers):
+    """Set up spotify-preview-finder and start the long-lived preview workers"""
+    global preview_worker_pool
+
+    if not fake_services_url:
+        # Check and install spotify-preview-finder if needed
+        if not check_spotify_preview_finder():
+            print("Failed to set up spotify-preview-finder. Exiting.")
+            exit(1)
         
-        # Process results as they complete
-        for future in concurrent.futures.as_completed(future_to_track):
-            try:
-                # We don't need to do anything with the result as the track is modified in-place
-                future.result()
-            except Exception as e:
-                with print_lock:
-                    print(f"Task generated an exception: {e}")
+        # Create the Node.js script for getting preview URLs
+        create_node_script()
+        
+        # Create .env file with Spotify credentials
+        create_dotenv_file(spotify_client_id, spotify_client_secret)
+        
+        # Try to load .env file (for local testing)
+        load_dotenv()
+    
+    # Start the long-lived Node.js workers for preview URLs
+    if preview_workers > 0:
+        preview_worker_pool = PreviewWorkerPool(preview_command + ["--worker"],
+                                                size=preview_workers, timeout=PREVIEW_TIMEOUT)
+
+def stop_preview_lookups():
+    """Stop the preview workers, if any were started"""
+    global preview_worker_pool
+
+    if preview_worker_pool:
+        stats = preview_worker_pool.stats()
+        run_metrics.set('preview_workers', stats)
+        print(f"Preview workers: {stats['workers']} processes, {stats['restarts']} restarts, {stats['timeouts']} timeouts")
+        preview_worker_pool.close()
+        preview_worker_pool = None
 
 def save_data_json(file_path, data):
     # Ensure data directory exists
@@ -234,225 +360,434 @@ def save_data_json(file_path, data):
     print(f"Data saved to {file_path}")
 
 def clean_up_lyrics(lyrics):
-    # Remove any instance of "You might also like" from song.lyrics
-    lyrics = lyrics.replace('You might also like', '')
+    return lyrics_normalizer.normalize(lyrics)
+
+def http_status(error):
+    """Get the status code of an HTTPError from lyricsgenius (which passes it as the first argument) or requests"""
+    if error.args and isinstance(error.args[0], int):
+        return error.args[0]
+    return error.response.status_code if error.response is not None else 0
+
+def search_song_with_retry(genius, song_title, song_artist, max_retries=5, delay=5, song_id=None):
+    """Search Genius for a song, or fetch it directly if its Genius ID is known (None if that ID is no longer there)"""
+    for i in range(max_retries):
+        if i > 0:
+            run_metrics.increment('genius_retries')
+        try:
+            with run_metrics.timed('genius_fetch_by_id' if song_id else 'genius_search'):
+                return genius.search_song(song_title, song_artist, song_id=song_id)
+        except requests.exceptions.Timeout:
+            run_metrics.increment('genius_timeouts')
+            with print_lock:
+                print(f"Timeout occurred for '{song_title}' by '{song_artist}'. Retrying ({i+1}/{max_retries}) after {delay} seconds...")
+            sleep(delay)
+            run_metrics.record_sleep('retry_delay', delay)
+        except requests.exceptions.HTTPError as e:
+            if http_status(e) == 429:  # Rate limit exceeded
+                # The shared rate limiter has already slowed down (and paused for Retry-After if given),
+                # so the retry simply waits for its next token
+                run_metrics.increment('genius_searches_rate_limited')
+                with print_lock:
+                    print(f"Rate limit exceeded for '{song_title}' by '{song_artist}'. Retrying ({i+1}/{max_retries}) at a lower rate...")
+            elif song_id and 400 <= http_status(e) < 500:
+                # The song is gone from Genius (or the ID is wrong), so retrying won't help
+                run_metrics.increment('genius_stale_ids')
+                with print_lock:
+                    print(f"Genius ID {song_id} for '{song_title}' by '{song_artist}' could not be fetched: {e}")
+                return None
+            else:
+                run_metrics.increment('genius_http_errors')
+                with print_lock:
+                    print(f"HTTP error occurred for '{song_title}' by '{song_artist}': {e}")
+                sleep(delay)
+                run_metrics.record_sleep('retry_delay', delay)
+    run_metrics.increment('genius_search_failures')
+    # Raised rather than returning None, so the track isn't mistaken for one Genius doesn't have
+    raise GeniusLookupFailed(f"Failed to get song '{song_title}' by '{song_artist}' after {max_retries} attempts.")
+
+def create_genius_client(genius_access_token, limiter, workers=GENIUS_WORKERS):
+    """Set up a Genius API client whose requests all go through the shared rate limiter"""
+    genius = lyricsgenius.Genius(genius_access_token)
+    genius.skip_non_songs = True  # Skip non-songs when searching (e.g. track lists)
+    genius.excluded_terms = ["(Live)"]  # Exclude songs with these words in their title
+    genius.verbose = False  # Lookups run concurrently, so we print our own status lines instead
+    genius.sleep_time = 0  # The limiter paces requests, so don't also sleep 0.2s after each one
 
-    # ensure all [ are preceeded by 2 newlines
-    lyrics = lyrics.replace('[', '\n\n[')
+    # Swap in a session that takes a token from the limiter before each request,
+    # with a kept-alive connection for each concurrent lookup
+    session = RateLimitedSession(limiter, run_metrics, 'genius_request')
+    session.headers.update(genius._session.headers)
+    mount_pooled_adapter(session, workers, http_cache)
+    genius._session = session
 
-    # Use a RegEx to ensure there are no more than 2 consecutive newlines
-    lyrics = re.sub(r'\n{3,}', '\n\n', lyrics)
+    # Point the client at local stand-ins instead of Genius when load testing
+    if fake_services_url:
+        redirect_to_fake_services(session, fake_services_url)
+    return genius
 
-    # Remove any line that contains the string "Contributors"
-    lyrics = '\n'.join([line for line in lyrics.split('\n') if 'Contributors' not in line])
+def process_song_lyrics(genius, song, lyrics_cache=None):
+    """Get and process the lyrics for a single track.
 
-    # If the last line ends in "Embed", remove "Embed" and any preceding numbers
-    if lyrics.split('\n')[-1].endswith('Embed'):
-        lyrics = '\n'.join(lyrics.split('\n')[:-1])
+    Returns a (Song, None) tuple if the track made it into the game data,
+    or (None, reason) if it was skipped.
+    """
+    reason = known_rejection(song, lyrics_cache)
+    if reason:
+        return None, reason
 
-    # Remove any line that contains the string "You might also like" using RegEx
-    lyrics = re.sub(r'^.*You might also like.*$', '', lyrics, flags=re.MULTILINE)
-    
-    # Remove any line that contains the string "LiveGet tickets as low as"
-    lyrics = re.sub(r'^.*LiveGet tickets as low as.*$', '', lyrics, flags=re.MULTILINE)
+    genius_data = find_lyrics(genius, song, lyrics_cache)
+    return process_found_lyrics(song, genius_data)
 
-    # Remove any instance of parentheses and their contents
-    # Lyrics within parenthesis often indicate lyrics that you can barely hear and likely would never know, so we remove them
-    lyrics = re.sub(r'\([^)]*\)', '', lyrics)
+def known_rejection(song, lyrics_cache=None):
+    """Return why a track was skipped in an earlier run, if it should be skipped again without any Genius requests"""
+    if not rejection_ledger:
+        return None
+    # Cached lyrics that differ from the ones the track was judged on get it judged again
+    cached_lyrics = lyrics_cache.peek(song['id']) if lyrics_cache else None
+    reason = rejection_ledger.get(song['id'], song['title'], song['artist'], cached_lyrics)
+    if reason:
+        with print_lock:
+            print(f"Skipping \"{song['title']}\" by {song['artist']} ({reason} in an earlier run).")
+    return reason
+
+def find_lyrics(genius, song, lyrics_cache=None):
+    """Get a track's raw lyrics from the cache or a Genius search, or None if not found"""
+    # Use cached lyrics for this track if we have them
+    genius_data = lyrics_cache.get(song['id']) if lyrics_cache else None
+    if genius_data:
+        with print_lock:
+            print(f"Using cached lyrics for \"{song['title']}\" by {song['artist']}.")
+    else:
+        # Fetch the song directly if this track (or one with a matching title and artist) was resolved before
+        genius_id, fuzzy = genius_index.lookup(song['id'], song['title'], song['artist']) if genius_index else (None, False)
+        if genius_id:
+            with print_lock:
+                print(f"Fetching \"{song['title']}\" by {song['artist']} by Genius ID {genius_id}...")
+            genius_data = search_song_with_retry(genius, song['title'], song['artist'], song_id=genius_id)
+            if not genius_data:
+                genius_index.forget(genius_id)
+            elif fuzzy and normalize_title(genius_data.title) != normalize_title(song['title']):
+                # A similar title by the same artist turned out to be a different song
+                run_metrics.increment('genius_fuzzy_mismatches')
+                with print_lock:
+                    print(f"Genius ID {genius_id} is \"{genius_data.title}\", not \"{song['title']}\".")
+                genius_data = None
+
+        if not genius_data:
+            # Search for the song on Genius, without Spotify-only title decorations like "- Remastered 2011"
+            search_title = clean_title(song['title'])
+            with print_lock:
+                print(f"Searching for \"{search_title}\" by {song['artist']}...")
+            genius_data = search_song_with_retry(genius, search_title, song['artist'])
 
-    # Replace nonstandard characters with standard characters
-    lyrics = lyrics.replace('\u0435', "e")
-    lyrics = lyrics.replace('\u2019', "'")
-    lyrics = lyrics.replace('\u2005', " ")
+        # Remember which Genius song this track resolved to
+        if genius_data and genius_index:
+            genius_index.put(song['id'], song['title'], song['artist'], genius_data.id)
 
-    return lyrics
+        # Cache the raw lyrics before they are cleaned up
+        if genius_data and lyrics_cache:
+            lyrics_cache.put(song['id'], genius_data)
+
+    return genius_data
+
+def process_found_lyrics(song, genius_data):
+    """Turn the lyrics found for a track into a (Song, None) or (None, reason) result"""
+    if not genius_data:
+        with print_lock:
+            print(f"Lyrics for {song['title']} by {song['artist']} not found.")
+        if rejection_ledger:
+            rejection_ledger.record(song['id'], song['title'], song['artist'], 'not_found')
+        return None, 'not_found'
+
+    # Keep the raw lyrics, since the clean up replaces them
+    raw_lyrics = genius_data.lyrics
+    with run_metrics.timed('lyrics_processing'):
+        result, skip_reason = song_from_lyrics(song, genius_data)
+
+    # Remember why the track was skipped, so later runs don't look it up again
+    if rejection_ledger:
+        if result:
+            rejection_ledger.clear(song['id'])
+        else:
+            rejection_ledger.record(song['id'], song['title'], song['artist'], skip_reason, raw_lyrics)
+    return result, skip_reason
+
+def song_from_lyrics(song, genius_data):
+    """Clean up a track's Genius lyrics and build its Song from the chorus.
+
+    Returns (Song, None), or (None, reason) if the chorus doesn't make the cut.
+    """
+    # Clean up lyrics property
+    genius_data.lyrics = clean_up_lyrics(genius_data.lyrics)
 
-def get_chorus(geniusData):
     # Calculate the chorus
-    # Identify the line that indicates the chorus denoted by "[Chorus:"
-    chorusIndicatorLine = ''
-    for line in geniusData.lyrics.split('\n'):
-        if '[Chorus' in line:
-            chorusIndicatorLine = line
-            break
-    
-    # If the chorus indicator line is found, extract the chorus
-    if chorusIndicatorLine != '':
-        chorus = ''
+    chorus_lines = find_chorus_lines(genius_data.lyrics)
 
-        # Use a regex to get all content between the first instance of chorusIndicatorLine and \n\n
-        chorus_content = re.search(rf"{re.escape(chorusIndicatorLine)}(.*?)\n\n", geniusData.lyrics, re.DOTALL)
+    # If the chorus was not found or is empty, then continue to next song
+    if not chorus_lines:
+        with print_lock:
+            print(f"Chorus not found for \"{song['title']}\". Proceeding to next song in array.")
+        return None, 'no_chorus'
 
-        if chorus_content:
-            chorus = chorus_content.group(1)
-        
-        # Remove any instance of \n from the beginning or end of the chorus
-        chorus = chorus.strip('\n')
-        print("\nChorus:")
-        print(chorus)
-        return chorus
-    else:
-        print("\n\n\n!!! Chorus not found among the following lyrics/data !!! :\n")
-        print(geniusData)
-        return None
+    # If there are more than 50 total words in the chorus, remove lines from the end
+    # until there are no more than 50 total words
+    chorus = trim_chorus(chorus_lines, CHORUS_MAX_WORDS)
 
-def search_song_with_retry(genius, song_title, song_artist, max_retries=5, delay=5):
-    for i in range(max_retries):
-        try:
-            return genius.search_song(song_title, song_artist)
-        except requests.exceptions.Timeout:
-            print(f"Timeout occurred for '{song_title}' by '{song_artist}'. Retrying ({i+1}/{max_retries}) after {delay} seconds...")
-            sleep(delay)
-        except requests.exceptions.HTTPError as e:
-            if "429" in str(e):  # Rate limit exceeded
-                cooldown = 60 + (i * 30)  # Increasing cooldown: 60s, 90s, 120s, 150s, 180s
-                print(f"Rate limit exceeded for '{song_title}' by '{song_artist}'. Cooling down for {cooldown} seconds...")
-                sleep(cooldown)
-            else:
-                print(f"HTTP error occurred for '{song_title}' by '{song_artist}': {e}")
-                sleep(delay)
-    print(f"Failed to get song '{song_title}' by '{song_artist}' after {max_retries} attempts.")
-    return None
+    # If there are fewer than 20 unique words in the chorus, then continue to next song
+    if chorus.unique_words < CHORUS_MIN_UNIQUE_WORDS:
+        with print_lock:
+            print(f"Less than {CHORUS_MIN_UNIQUE_WORDS} unique words in \"{song['title']}\". Proceeding to next song in array.")
+        return None, 'too_few_unique_words'
 
-def process_lyrics_with_genius(top_songs, genius_access_token):
-    """Process song lyrics using Genius API (sequential to avoid rate limiting)"""
-    print("\n=== Processing lyrics with Genius API (sequential to avoid rate limiting) ===\n")
-    
-    # Set up the Genius API client
-    genius = lyricsgenius.Genius(genius_access_token)
-    genius.skip_non_songs = True  # Skip non-songs when searching (e.g. track lists)
-    genius.excluded_terms = ["(Live)"]  # Exclude songs with these words in their title
+    with print_lock:
+        print(f"\nChorus for \"{song['title']}\" ({chorus.total_words} total words, {chorus.unique_words} unique words):")
+        print(chorus.text)
 
-    # Initialize an array to store the song data (including lyrics)
-    song_data = []
-    rate_limit_hits = 0
-    
-    # Get the lyrics for each song from the Genius API sequentially
+    return Song(song['id'], genius_data.title, genius_data.artist, song['preview_url'], chorus.text), None
+
+def process_song_lyrics_safely(genius, song, lyrics_cache=None):
+    """Process a single track's lyrics - for parallel execution"""
+    try:
+        return process_song_lyrics(genius, song, lyrics_cache)
+    except Exception as e:
+        # Errors are not journaled, so the track is tried again on --resume
+        with print_lock:
+            print(f"Error processing song {song['title']} by {song['artist']}: {e}")
+        return None, None
+
+def process_lyrics_with_genius(top_songs, genius_access_token, lyrics_cache=None, journal=None, limiter=None, workers=GENIUS_WORKERS,
+                               writer=None):
+    """Process song lyrics using Genius API (concurrent lookups behind a shared rate limiter)
+
+    Returns the accepted songs in track order. If a writer is given, each accepted song is
+    written to it instead, as soon as every track before it is done, and nothing is returned.
+    """
+    print(f"\n=== Processing lyrics with Genius API ({workers} concurrent lookups) ===\n")
+
+    # All lookups share one adaptive rate limiter
+    if limiter is None:
+        limiter = AdaptiveRateLimiter(rate=GENIUS_INITIAL_RATE)
+    genius = create_genius_client(genius_access_token, limiter, workers)
+
+    # Results are kept in track order no matter which lookup finishes first
+    results = [None] * len(top_songs)
+    done = [False] * len(top_songs)
+    pending = []
     for i, song in enumerate(top_songs):
-        print(f"\nSong {i+1}/{len(top_songs)}")
-        print(f"Searching for \"{song['title']}\" by {song['artist']}...")
-        
-        # If we've hit rate limit 3 times consecutively, take a long break
-        if rate_limit_hits >= 3:
-            cooldown = 300  # 5 minutes
-            print(f"\nHit rate limit multiple times. Taking a longer {cooldown} second break to reset API limits...")
-            sleep(cooldown)
-            rate_limit_hits = 0
-        
-        try:
-            # Search for the song on Genius
-            genius_data = search_song_with_retry(genius, song['title'], song['artist'])
-
-            if genius_data:  # is found
-                # Reset rate limit counter on success
-                rate_limit_hits = 0
-                
-                # Clean up lyrics property
-                genius_data.lyrics = clean_up_lyrics(genius_data.lyrics)
-
-                # Calculate the chorus
-                chorus = get_chorus(genius_data)
-
-                # If the chorus was not found or is None, then continue to next song
-                if chorus == '' or chorus is None:
-                    print("Chorus not found. Proceeding to next song in array.")
-                    print("\n\n\n")
-                    continue
-
-                # If there are more than 50 total words in the chorus,
-                # repeatedly remove the last line from the chorus until
-                # there are fewer than 50 total words AND more than 20 unique words in the chorus
-                words = chorus.split()
-                total_words_count = len(words)
-                while total_words_count > 50:
-                    print(f"\n{total_words_count} total words detected. Removing last line from chorus.")
-                    chorus = '\n'.join(chorus.split('\n')[:-1])
-
-                    print("\nChorus After Last Line Removal:")
-                    print(chorus)
-
-                    # Recalculate the total number of words in the chorus
-                    words = chorus.split()
-                    total_words_count = len(words)
-                    
-                # If there are fewer than 20 unique words in the chorus, then continue to next song
-                unique_words = set(words)
-                if len(unique_words) < 20:
-                    print("Less than 20 unique words. Proceeding to next song in array.")
-                    print("\n\n\n")
-                    continue
-
-                print("\nTotal Words in Chorus: " + str(total_words_count))
-                print("\nUnique Words in Chorus: " + str(len(unique_words)))
-
-                # Add the song with the lyrics to the song_data array
-                song_data.append(Song(song['id'], genius_data.title, genius_data.artist, song['preview_url'], chorus))
-            else:
-                print(f"Lyrics for {song['title']} by {song['artist']} not found.")
-        except requests.exceptions.HTTPError as e:
-            if "429" in str(e):  # Rate limit exceeded
-                rate_limit_hits += 1
-                print(f"Rate limit hit for {song['title']} by {song['artist']}. This is hit #{rate_limit_hits}.")
-                cooldown = 60 * rate_limit_hits  # Increasing cooldown based on consecutive hits
-                print(f"Cooling down for {cooldown} seconds...")
-                sleep(cooldown)
+        # Reuse the result from the journal if this track was already done before a resume
+        if journal and song['id'] in journal.entries:
+            entry = journal.entries[song['id']]
+            if entry['type'] == 'accepted':
+                results[i] = Song(**entry['song'])
+            done[i] = True
+        else:
+            pending.append(i)
+
+    # Songs before this index have been written and let go
+    written = 0
+    def write_finished_songs():
+        nonlocal written
+        while written < len(results) and done[written]:
+            if results[written]:
+                writer.write(results[written].to_dict())
+                results[written] = None
+            written += 1
+
+    if journal and len(pending) < len(top_songs):
+        print(f"Skipping {len(top_songs) - len(pending)} tracks already processed before resuming")
+
+    completed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        future_to_index = {executor.submit(process_song_lyrics_safely, genius, top_songs[i], lyrics_cache): i for i in pending}
+
+        for future in concurrent.futures.as_completed(future_to_index):
+            i = future_to_index[future]
+            song = top_songs[i]
+            results[i], skip_reason = future.result()
+            done[i] = True
+            completed += 1
+            if results[i]:
+                run_metrics.increment('songs_accepted')
             else:
-                print(f"Error processing song {song['title']} by {song['artist']}: {e}")
-        except Exception as e:
-            print(f"Error processing song {song['title']} by {song['artist']}: {e}")
-            
-        # Add a small delay between requests to avoid hitting rate limits
-        if i % 5 == 0 and i > 0:
-            print("Taking a short break to avoid rate limiting...")
-            sleep(3)
+                # Errors have no skip reason
+                run_metrics.record_skip(skip_reason or 'error')
+
+            if journal:
+                if results[i]:
+                    journal.record_accepted(song['id'], results[i].to_dict())
+                elif skip_reason:
+                    journal.record_skipped(song['id'], skip_reason)
+
+            if writer:
+                write_finished_songs()
+
+            stats = limiter.stats()
+            with print_lock:
+                print(f"\nSong {completed}/{len(pending)} done. Genius rate: {stats['rate']} req/s, "
+                      f"{stats['queue_depth']} waiting, {stats['rate_limited']} rate limited so far")
+
+    return [song for song in results if song]
+
+def load_json_if_exists(file_path, default=None):
+    """Load a JSON file, or return default if it doesn't exist yet"""
+    if not os.path.exists(file_path):
+        return default
+    with open(file_path, 'r') as file:
+        return json.load(file)
+
+def diff_top_songs(previous_songs, top_songs):
+    """Compare a newly fetched track list to the previous one by track ID.
+
+    Returns the tracks that need to go through Genius again (new tracks, or tracks
+    whose title or artist changed) and the IDs of tracks that were removed.
+    """
+    previous_by_id = {song['id']: song for song in previous_songs}
+    current_ids = set()
+    tracks_to_process = []
+
+    for song in top_songs:
+        current_ids.add(song['id'])
+        previous = previous_by_id.get(song['id'])
+        if previous is None or previous['title'] != song['title'] or previous['artist'] != song['artist']:
+            tracks_to_process.append(song)
+
+    removed_ids = [song_id for song_id in previous_by_id if song_id not in current_ids]
+    return tracks_to_process, removed_ids
+
+def merge_song_data(top_songs, previous_game_data, new_song_data, processed_ids):
+    """Merge newly processed songs with previous game data in playlist order.
+
+    Tracks that were processed this run use their new result (or are dropped if they
+    were rejected). Other tracks keep their previous game data entry, with the preview
+    URL refreshed from the playlist. Removed tracks are dropped.
+    """
+    previous_by_id = {song['spotify_id']: song for song in previous_game_data}
+    new_by_id = {song.spotify_id: song for song in new_song_data}
+    song_data = []
+
+    for track in top_songs:
+        if track['id'] in processed_ids:
+            song = new_by_id.get(track['id'])
+        elif track['id'] in previous_by_id:
+            song = Song(**previous_by_id[track['id']])
+            if track['preview_url']:
+                song.preview_url = track['preview_url']
+        else:
+            # Rejected on a previous run and unchanged since, so it would be rejected again
+            song = None
+
+        if song:
+            song_data.append(song)
 
     return song_data
 
-def fetch_spotify_songs(client_id, client_secret):
-    """Fetch top songs from Spotify"""
-    print("\n=== Fetching songs from Spotify ===\n")
-    
-    # Set up Spotify client
-    sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
+def tracks_from_playlist_items(items):
+    """Create an array of objects that contains the song name, artist name, song ID, and preview URL"""
+    # Items without a track (e.g. removed or local tracks) are skipped
+    return [{'title': item['track']['name'], 'artist': item['track']['artists'][0]['name'], 'id': item['track']['id'], 'preview_url': item['track']['preview_url']} for item in items if item.get('track')]
+
+def parse_playlist_id(source):
+    """Get a playlist ID from an ID, a spotify:playlist: URI or an open.spotify.com URL"""
+    source = source.strip()
+    if source.startswith('spotify:playlist:'):
+        return source[len('spotify:playlist:'):]
+    if '/playlist/' in source:
+        return source.split('/playlist/', 1)[1].split('?', 1)[0].strip('/')
+    return source
+
+def load_playlist_ids(playlists, playlists_file=None):
+    """Combine the playlists given on the command line and in a file (one per line, # for comments)"""
+    sources = list(playlists or [])
+    if playlists_file:
+        with open(playlists_file, 'r', encoding='utf-8') as file:
+            sources += [line.split('#', 1)[0] for line in file]
+    # Each playlist is only fetched once, in the order given
+    playlist_ids = dict.fromkeys(parse_playlist_id(source) for source in sources if source.strip())
+    return list(playlist_ids) or [top_songs_playlist_id]
+
+def create_spotify_client(client_id, client_secret):
+    """Set up a Spotify client (pointed at local stand-ins when load testing)"""
+    # One kept-alive connection per concurrent page fetch, with spotipy's usual retries
+    session = create_pooled_session(PLAYLIST_PAGE_WORKERS, http_cache, spotify_retry())
+
+    if fake_services_url:
+        redirect_to_fake_services(session, fake_services_url)
+        return spotipy.Spotify(auth='fake-token', requests_session=session)
+
+    return spotipy.Spotify(requests_session=session, auth_manager=SpotifyOAuth(
         client_id=client_id,
         client_secret=client_secret,
         redirect_uri='http://localhost:8888/callback/',
-        scope='playlist-read-private'))
-
-    # ID of the public playlist of Spotify's most streamed songs
-    playlist_id = '58zw0vG0X5GdT82of2G22L'
+        scope='playlist-read-private',
+        requests_session=session))
 
-    # Initialize an empty list to store all tracks
-    all_tracks = []
+def fetch_spotify_songs(client_id, client_secret, playlist_ids=(top_songs_playlist_id,)):
+    """Fetch the songs of one or more Spotify playlists, without duplicates"""
+    print("\n=== Fetching songs from Spotify ===\n")
+    
+    # Set up Spotify client
+    sp = create_spotify_client(client_id, client_secret)
 
     # Set the limit
     limit = 100
 
-    # Calculate the number of pages
-    pages = 500 // limit
-    remainder = 500 % limit
-    if remainder > 0:
-        pages += 1
-
-    # Loop through each page
-    for i in range(pages):
-        # Calculate the offset
-        offset = i * limit
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as preview_executor, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=PLAYLIST_PAGE_WORKERS) as page_executor:
+        def fetch_page(playlist_id, offset):
+            with run_metrics.timed('spotify_page'):
+                return sp.playlist_items(playlist_id, limit=limit, offset=offset)
 
-        # Get the playlist items
-        results = sp.playlist_items(playlist_id, limit=limit, offset=offset)
+        # The first page of each playlist also tells us how many tracks it has
+        first_page_futures = {page_executor.submit(fetch_page, playlist_id, 0): p for p, playlist_id in enumerate(playlist_ids)}
 
-        # Get track data
-        tracks = results['items']
+        # As soon as a page arrives, start updating its preview URLs using spotify-preview-finder
+        # so that preview lookups overlap with fetching the rest of the playlists.
+        # Pages are deduplicated in playlist order (holding back any page that arrives before the
+        # ones ahead of it), so a song that is in several playlists is kept where it first appears
+        # and only that occurrence is looked up.
+        deduplicator = TrackDeduplicator()
+        all_tracks = []
+        pages = {}  # (playlist index, page index) -> results, until every page before it has arrived
+        page_counts = {}  # playlist index -> number of pages
+        next_page = (0, 0)
+        preview_futures = []
+        def queue_page(key, results):
+            nonlocal next_page
+            pages[key] = results
+            while next_page in pages:
+                for track in tracks_from_playlist_items(pages.pop(next_page)['items']):
+                    if deduplicator.add(track):
+                        all_tracks.append(track)
+                        preview_futures.append(preview_executor.submit(process_track_preview, track))
+                p, page_index = next_page
+                next_page = (p, page_index + 1) if page_index + 1 < page_counts[p] else (p + 1, 0)
 
-        # Create an array of objects that contains the song name, artist name, song ID, and preview URL
-        tracks = [{'title': track['track']['name'], 'artist': track['track']['artists'][0]['name'], 'id': track['track']['id'], 'preview_url': track['track']['preview_url']} for track in tracks]
+        with print_lock:
+            print(f"Updating preview URLs using {MAX_WORKERS} parallel threads...\n")
+        page_futures = {}
+        for future in concurrent.futures.as_completed(first_page_futures):
+            p = first_page_futures[future]
+            results = future.result()
+            total = results['total']
+            page_counts[p] = max(1, (total + limit - 1) // limit)
+            with print_lock:
+                print(f"Playlist {playlist_ids[p]} has {total} tracks across {page_counts[p]} pages")
+            queue_page((p, 0), results)
+            # Fetch the playlist's remaining pages concurrently
+            page_futures.update({page_executor.submit(fetch_page, playlist_ids[p], offset): (p, offset // limit)
+                                 for offset in range(limit, total, limit)})
+        for future in concurrent.futures.as_completed(page_futures):
+            queue_page(page_futures[future], future.result())
 
-        # Add the tracks to the all_tracks list
-        all_tracks.extend(tracks)
+        # Wait for the remaining preview lookups (tracks are modified in-place)
+        for future in concurrent.futures.as_completed(preview_futures):
+            try:
+                future.result()
+            except Exception as e:
+                with print_lock:
+                    print(f"Task generated an exception: {e}")
 
-    # Update preview URLs using spotify-preview-finder with multithreading
-    update_preview_urls_with_spotify_preview_finder(all_tracks)
+    deduplicator.report(len(playlist_ids))
 
     # Save track data to JSON file
     save_data_json(top_songs_json, all_tracks)
@@ -460,55 +795,329 @@ def fetch_spotify_songs(client_id, client_secret):
     print(f"Total Tracks: {len(all_tracks)}")
     return all_tracks
 
+def curate_with_async_engine(client_id, client_secret, genius_access_token, lyrics_cache, limiter,
+                             genius_workers=GENIUS_WORKERS, playlist_ids=(top_songs_playlist_id,)):
+    """Fetch, preview and look up lyrics for every track as one overlapping pipeline.
+
+    Each track moves on to its Genius lookup as soon as its own preview URL is known,
+    instead of waiting for the whole playlist. Returns (all_tracks, song_data) in
+    playlist order, the same as fetch_spotify_songs and process_lyrics_with_genius.
+    """
+    print(f"\n=== Curating with the async engine ({MAX_WORKERS} preview lookups, {genius_workers} Genius lookups) ===\n")
+
+    sp = create_spotify_client(client_id, client_secret)
+    genius = create_genius_client(genius_access_token, limiter, genius_workers)
+    limit = 100
+
+    def fetch_page(playlist_id, offset):
+        with run_metrics.timed('spotify_page'):
+            return sp.playlist_items(playlist_id, limit=limit, offset=offset)
+
+    async def playlist_tracks():
+        loop = asyncio.get_running_loop()
+        deduplicator = TrackDeduplicator()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=PLAYLIST_PAGE_WORKERS) as page_executor:
+            def fetch_playlist_page(playlist_id, offset):
+                return loop.run_in_executor(page_executor, fetch_page, playlist_id, offset)
+
+            # The first page of each playlist also tells us how many tracks it has
+            first_pages = [fetch_playlist_page(playlist_id, 0) for playlist_id in playlist_ids]
+            for p, playlist_id in enumerate(playlist_ids):
+                first_page = await first_pages[p]
+                total = first_page['total']
+                print(f"Playlist {playlist_id} has {total} tracks across {max(1, (total + limit - 1) // limit)} pages")
+                remaining_pages = {offset: fetch_playlist_page(playlist_id, offset) for offset in range(limit, total, limit)}
+
+                # Pages are taken in playlist order (while the rest keep downloading), so the first
+                # occurrence of a song in several playlists is always the one that is kept.
+                # Keys keep the playlist position, so the results can be put back in order.
+                for offset in range(0, total, limit):
+                    results = first_page if offset == 0 else await remaining_pages[offset]
+                    for j, track in enumerate(tracks_from_playlist_items(results['items'])):
+                        if deduplicator.add(track):
+                            yield (p, offset, j), track
+        deduplicator.report(len(playlist_ids))
+
+    def lyrics(track):
+        try:
+            reason = known_rejection(track, lyrics_cache)
+            if reason:
+                return track, None, reason, None
+            return track, find_lyrics(genius, track, lyrics_cache), None, None
+        except Exception as e:
+            return track, None, None, e
+
+    def chorus(entry):
+        track, genius_data, rejection, error = entry
+        try:
+            if rejection:
+                return track, (None, rejection)
+            if error is None:
+                return track, process_found_lyrics(track, genius_data)
+        except Exception as e:
+            error = e
+        with print_lock:
+            print(f"Error processing song {track['title']} by {track['artist']}: {error}")
+        return track, (None, None)
+
+    engine = AsyncCurationEngine([
+        PipelineStage('preview', process_track_preview, MAX_WORKERS),
+        PipelineStage('lyrics', lyrics, genius_workers),
+        PipelineStage('chorus', chorus, 1),
+    ])
+    results = asyncio.run(engine.run(playlist_tracks()))
+
+    all_tracks = []
+    song_data = []
+    for key in sorted(results):
+        track, (song, skip_reason) = results[key]
+        all_tracks.append(track)
+        if song:
+            song_data.append(song)
+            run_metrics.increment('songs_accepted')
+        else:
+            # Errors have no skip reason
+            run_metrics.record_skip(skip_reason or 'error')
+
+    # Save track data to JSON file
+    save_data_json(top_songs_json, all_tracks)
+
+    print(f"Total Tracks: {len(all_tracks)}")
+    return all_tracks, song_data
+
 def main():
+    global lyrics_normalizer, preview_command, fake_services_url, http_cache, genius_index, rejection_ledger, MAX_WORKERS
+
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Curate data for Lyricle game')
     parser.add_argument('--use-existing-songs', action='store_true', 
                         help='Use existing topSongs.json instead of fetching from Spotify API')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only process tracks added or changed since the previous topSongs.json and merge them into the existing game data')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume an interrupted run from its journal, reusing topSongs.json and skipping tracks that were already processed')
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS,
+                        help='Number of parallel threads for preview URL lookups')
+    parser.add_argument('--preview-workers', type=int, default=PREVIEW_NODE_WORKERS,
+                        help='Number of long-lived Node.js processes for preview URLs (0 to start one per track)')
+    parser.add_argument('--genius-workers', type=int, default=GENIUS_WORKERS,
+                        help='Number of concurrent Genius lookups')
+    parser.add_argument('--genius-rate', type=float, default=GENIUS_INITIAL_RATE,
+                        help='Genius requests per second to start at (adjusted automatically on 429 responses)')
+    parser.add_argument('--character-folding', metavar='JSON_FILE',
+                        help='JSON file of extra characters to replace in lyrics, e.g. {"\\u2018": "\'"}')
+    parser.add_argument('--no-lyrics-cache', action='store_true',
+                        help='Always search Genius instead of using cached lyrics')
+    parser.add_argument('--lyrics-cache-ttl-days', type=float, default=LYRICS_CACHE_TTL_DAYS,
+                        help='Days before cached Genius lyrics are fetched again')
+    parser.add_argument('--lyrics-cache-size', type=int, default=LYRICS_CACHE_MAX_ENTRIES,
+                        help='Max number of tracks kept in the lyrics cache')
+    parser.add_argument('--recheck-rejections', action='store_true',
+                        help='Look up tracks that were skipped in earlier runs again instead of skipping them')
+    parser.add_argument('--rejection-ttl-days', type=float, default=REJECTION_TTL_DAYS,
+                        help='Days before a track skipped in an earlier run is looked up again')
+    parser.add_argument('--no-genius-index', action='store_true',
+                        help='Always search Genius instead of fetching previously resolved songs by ID')
+    parser.add_argument('--no-http-cache', action='store_true',
+                        help='Always download Spotify and Genius API responses in full instead of revalidating cached ones')
+    parser.add_argument('--http-cache-size', type=int, default=HTTP_CACHE_MAX_ENTRIES,
+                        help='Max number of API responses kept for conditional requests')
+    parser.add_argument('--playlist', action='append', metavar='ID_OR_URL',
+                        help='Spotify playlist to take songs from (repeat for several; defaults to the most streamed songs playlist)')
+    parser.add_argument('--playlists-file', metavar='FILE',
+                        help='Text file of Spotify playlists to take songs from, one ID or URL per line')
+    parser.add_argument('--async-engine', action='store_true',
+                        help='Run playlist paging, preview lookups and Genius lookups as one overlapping pipeline')
+    parser.add_argument('--game-data', default=game_data_json,
+                        help='Where to write the uncensored game data (a .lyrc path writes the compact columnar format)')
+    parser.add_argument('--report', default=curation_report_json,
+                        help='Where to write the JSON run report (stage timings, request latencies, retries, skips)')
+    parser.add_argument('--live-report', type=float, metavar='SECONDS',
+                        help='Also rewrite the run report every SECONDS while the run is in progress')
+    parser.add_argument('--fake-services', metavar='URL',
+                        help='Use the local stand-ins started by fake_services.py instead of Spotify, Genius and spotify-preview-finder')
     args = parser.parse_args()
+    MAX_WORKERS = args.max_workers
+    playlist_ids = load_playlist_ids(args.playlist, args.playlists_file)
+
+    if args.async_engine and (args.use_existing_songs or args.incremental or args.resume):
+        parser.error('--async-engine always fetches the playlist, so it cannot be combined with '
+                     '--use-existing-songs, --incremental or --resume')
+
+    if args.live_report:
+        run_metrics.start_live(args.report, args.live_report)
+
+    # Add any extra character folding rules to the lyrics clean up
+    if args.character_folding:
+        with open(args.character_folding, 'r', encoding='utf-8') as file:
+            lyrics_normalizer = LyricsNormalizer(json.load(file))
+
+    # A resumed run has to work on the same track list, in the same mode, as the interrupted one
+    journal = None
+    if args.resume:
+        args.use_existing_songs = True
+        journal = CurationJournal(curation_journal_jsonl, resume=True)
+        print(f"Resuming from {curation_journal_jsonl}: {len(journal.entries)} tracks already processed")
+        if journal.incremental is not None and journal.incremental != args.incremental:
+            # Otherwise an incremental run's partial results would replace the whole game data
+            print(f"Resuming in {'incremental' if journal.incremental else 'full'} mode, like the interrupted run")
+            args.incremental = journal.incremental
     
     print("Starting Lyricle data curation process...\n")
     
-    # Get Spotify client credentials
-    spotify_client_id = get_client_id(spotify_client_id_filename, "Spotify")
-    spotify_client_secret = get_client_secret("Spotify", spotify_client_secret_filename)
-    
-    # Get Genius API access token
-    genius_access_token = get_client_secret("Genius", genius_client_access_token_filename)
-    
-    # Check if we should use existing songs data
-    if args.use_existing_songs and os.path.exists(top_songs_json):
-        print(f"Using existing songs data from {top_songs_json}")
-        with open(top_songs_json, 'r') as file:
-            top_songs = json.load(file)
-        print(f"Loaded {len(top_songs)} tracks from existing file")
+    if args.fake_services:
+        # The stand-ins don't check credentials
+        fake_services_url = args.fake_services
+        preview_command = fake_preview_command(fake_services_url)
+        print(f"Using fake services at {fake_services_url}")
+        spotify_client_id = spotify_client_secret = genius_access_token = 'fake'
     else:
-        # Check and install spotify-preview-finder if needed
-        if not check_spotify_preview_finder():
-            print("Failed to set up spotify-preview-finder. Exiting.")
-            exit(1)
+        # Get Spotify client credentials
+        spotify_client_id = get_client_id(spotify_client_id_filename, "Spotify")
+        spotify_client_secret = get_client_secret("Spotify", spotify_client_secret_filename)
         
-        # Create the Node.js script for getting preview URLs
-        create_node_script()
-        
-        # Create .env file with Spotify credentials
-        create_dotenv_file(spotify_client_id, spotify_client_secret)
-        
-        # Try to load .env file (for local testing)
-        load_dotenv()
-        
-        # Fetch songs from Spotify
-        top_songs = fetch_spotify_songs(spotify_client_id, spotify_client_secret)
+        # Get Genius API access token
+        genius_access_token = get_client_secret("Genius", genius_client_access_token_filename)
+    
+    # Load the previous run's data before it gets overwritten
+    if args.incremental:
+        previous_songs = load_json_if_exists(top_songs_json, [])
+        previous_game_data = read_game_data(args.game_data) if os.path.exists(args.game_data) else []
+        print(f"Incremental mode: loaded {len(previous_songs)} previous tracks and {len(previous_game_data)} previous songs")
+
+    # Open the Genius lyrics cache
+    lyrics_cache = None
+    if not args.no_lyrics_cache:
+        lyrics_cache = LyricsCache(lyrics_cache_db, ttl_seconds=args.lyrics_cache_ttl_days * 24 * 60 * 60,
+                                   max_entries=args.lyrics_cache_size)
+
+    # Songs are written to the game data file as they are accepted
+    writer = GameDataWriter(args.game_data, ensure_ascii=True)
+
+    # Open the ledger of tracks skipped in earlier runs, tied to the current chorus rules
+    rules = f"max_words={CHORUS_MAX_WORDS};min_unique_words={CHORUS_MIN_UNIQUE_WORDS};folding={sorted(lyrics_normalizer.folding)}"
+    rejection_ledger = RejectionLedger(rejection_ledger_db, rules, ttl_seconds=args.rejection_ttl_days * 24 * 60 * 60,
+                                       recheck=args.recheck_rejections)
+
+    # Open the index of Genius songs that tracks were resolved to
+    if not args.no_genius_index:
+        genius_index = GeniusIndex(genius_index_db)
+
+    # Open the cache of API responses for conditional requests
+    if not args.no_http_cache:
+        http_cache = HttpCache(http_cache_db, max_entries=args.http_cache_size)
+
+    # Genius requests go through a shared adaptive rate limiter
+    limiter = AdaptiveRateLimiter(rate=args.genius_rate)
+
+    if args.async_engine:
+        # Fetch, preview and lyrics lookups overlap track by track
+        start_preview_lookups(spotify_client_id, spotify_client_secret, args.preview_workers)
+        try:
+            with run_metrics.stage('async_pipeline'):
+                top_songs, song_data = curate_with_async_engine(spotify_client_id, spotify_client_secret, genius_access_token,
+                                                                lyrics_cache, limiter, args.genius_workers, playlist_ids)
+        finally:
+            stop_preview_lookups()
+        tracks_to_process = top_songs
+    else:
+        # Check if we should use existing songs data
+        if args.use_existing_songs and os.path.exists(top_songs_json):
+            print(f"Using existing songs data from {top_songs_json}")
+            with open(top_songs_json, 'r') as file:
+                top_songs = json.load(file)
+            print(f"Loaded {len(top_songs)} tracks from existing file")
+        else:
+            start_preview_lookups(spotify_client_id, spotify_client_secret, args.preview_workers)
+            
+            # Fetch songs from Spotify
+            try:
+                with run_metrics.stage('spotify_and_previews'):
+                    top_songs = fetch_spotify_songs(spotify_client_id, spotify_client_secret, playlist_ids)
+            finally:
+                stop_preview_lookups()
+
+        # Open the journal that checkpoints each processed track
+        if journal is None:
+            journal = CurationJournal(curation_journal_jsonl)
+
+        # In incremental mode, only tracks that are new or changed go through Genius
+        tracks_to_process = top_songs
+        if args.resume and journal.plan is not None:
+            # topSongs.json has already been overwritten, so use the interrupted run's plan
+            planned_ids = set(journal.plan)
+            tracks_to_process = [track for track in top_songs if track['id'] in planned_ids]
+        elif args.incremental:
+            tracks_to_process, removed_ids = diff_top_songs(previous_songs, top_songs)
+            print(f"\n{len(tracks_to_process)} tracks added or changed, {len(removed_ids)} removed, "
+                  f"{len(top_songs) - len(tracks_to_process)} unchanged")
+
+        if journal.plan is None:
+            journal.record_plan((track['id'] for track in tracks_to_process), args.incremental)
+
+        # Process lyrics with Genius
+        try:
+            with run_metrics.stage('genius_lyrics'):
+                # Accepted songs go straight to disk, except when they still need to be merged
+                song_data = process_lyrics_with_genius(tracks_to_process, genius_access_token, lyrics_cache, journal,
+                                                       limiter, args.genius_workers, None if args.incremental else writer)
+        finally:
+            journal.close()
+
+    stats = limiter.stats()
+    run_metrics.set('genius_rate_limiter', stats)
+    run_metrics.record_sleep('genius_rate_limiter', stats['wait_time'])
+    print(f"\nGenius Requests: {stats['requests']} ({stats['rate_limited']} rate limited), "
+          f"final rate {stats['rate']} req/s, {stats['wait_time']}s spent waiting for the rate limiter")
+
+    # Merge the new results back into the previous game data in playlist order
+    if args.incremental:
+        processed_ids = {track['id'] for track in tracks_to_process}
+        song_data = merge_song_data(top_songs, previous_game_data, song_data, processed_ids)
+
+    if lyrics_cache:
+        stats = lyrics_cache.stats()
+        run_metrics.set('lyrics_cache', stats)
+        print(f"\nLyrics Cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['expired']} expired), {stats['evictions']} evicted, {stats['entries']} cached")
+        lyrics_cache.close()
     
-    # Process lyrics with Genius (sequential to avoid rate limiting)
-    song_data = process_lyrics_with_genius(top_songs, genius_access_token)
+    stats = rejection_ledger.stats()
+    run_metrics.set('rejection_ledger', stats)
+    print(f"Rejection Ledger: {stats['skipped']} tracks skipped without a lookup, {stats['recorded']} rejections recorded, "
+          f"{stats['cleared']} cleared, {stats['entries']} known")
+    rejection_ledger.close()
+
+    if genius_index:
+        stats = genius_index.stats()
+        run_metrics.set('genius_index', stats)
+        print(f"Genius Index: {stats['hits']} fetched by ID ({stats['fuzzy_hits']} by similar title), "
+              f"{stats['misses']} searched, {stats['entries']} tracks indexed")
+        genius_index.close()
+
+    if http_cache:
+        stats = http_cache.stats()
+        run_metrics.set('http_cache', stats)
+        print(f"HTTP Cache: {stats['revalidated']} responses unchanged (304), {stats['stored']} stored, "
+              f"{stats['evictions']} evicted, {stats['entries']} cached")
+        http_cache.close()
     
     # Save final game data
-    save_data_json(game_data_json, [song.__dict__ for song in song_data])
+    with run_metrics.stage('save'):
+        for song in song_data:
+            writer.write(song.to_dict())
+        writer.close()
+        print(f"Data saved to {args.game_data}")
+    
+    # Write the run report
+    run_metrics.stop_live()
+    run_metrics.set('songs', {'queried': len(tracks_to_process), 'in_game_data': writer.count})
+    run_metrics.write(args.report)
     
     # Print summary
-    print(f"\nTotal Songs Queried: {len(top_songs)}")
-    print(f"Total Songs in Game Data: {len(song_data)}")
+    print(f"\nTotal Songs Queried: {len(tracks_to_process)}")
+    print(f"Total Songs in Game Data: {writer.count}")
+    print(f"Run report saved to {args.report}")
     print("\nLyricle data curation complete!")
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+'''
+Asyncio engine that runs each track through the curation pipeline on its own.
+
+Tracks go through a chain of stages (e.g. preview URL, then lyrics search, then
+chorus extraction) as soon as they arrive, instead of each phase waiting for the
+previous one to finish for every track. Each stage has its own concurrency limit
+and a bounded queue in front of it, so a slow stage holds back the ones feeding it
+rather than letting work pile up in memory.
+
+Stage functions are ordinary blocking functions (spotipy, lyricsgenius and the
+preview workers are all synchronous), so they run in a thread pool.
+'''
+
+import asyncio
+import concurrent.futures
+
+#region Global Variable Declarations
+STAGE_QUEUE_SIZE = 64  # Tracks waiting in front of each stage before the previous stage pauses
+_DONE = object()  # Tells a stage worker there is no more work
+#endregion Global Variable Declarations
+
+#region Classes
+class PipelineStage:
+    """One step of the per-track pipeline.
+
+    function takes the item from the previous stage and returns the item for the
+    next one. At most workers items are in this stage at once.
+    """
+
+    def __init__(self, name, function, workers):
+        self.name = name
+        self.function = function
+        self.workers = workers
+
+class AsyncCurationEngine:
+    """Runs items from an async source through a chain of stages concurrently."""
+
+    def __init__(self, stages, queue_size=STAGE_QUEUE_SIZE):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    async def run(self, source):
+        """Run every (key, item) pair from source through all stages.
+
+        Returns {key: final item}. Keys only identify items (e.g. to restore playlist
+        order afterwards); items finish in whatever order their stages complete.
+        """
+        loop = asyncio.get_running_loop()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = {}
+
+        async def work(stage_index, executor):
+            stage = self.stages[stage_index]
+            queue = queues[stage_index]
+            while True:
+                entry = await queue.get()
+                if entry is _DONE:
+                    return
+                key, item = entry
+                item = await loop.run_in_executor(executor, stage.function, item)
+                if stage_index + 1 < len(self.stages):
+                    # Waits while the next stage is backed up
+                    await queues[stage_index + 1].put((key, item))
+                else:
+                    results[key] = item
+
+        async def run_stage(stage_index, executor):
+            stage = self.stages[stage_index]
+            await asyncio.gather(*(work(stage_index, executor) for _ in range(stage.workers)))
+            # Once this stage has drained, let the next stage's workers finish too
+            if stage_index + 1 < len(self.stages):
+                for _ in range(self.stages[stage_index + 1].workers):
+                    await queues[stage_index + 1].put(_DONE)
+
+        async def feed():
+            async for key, item in source:
+                await queues[0].put((key, item))
+            for _ in range(self.stages[0].workers):
+                await queues[0].put(_DONE)
+
+        # Enough threads for every stage to run at its full concurrency
+        with concurrent.futures.ThreadPoolExecutor(max_workers=sum(stage.workers for stage in self.stages)) as executor:
+            await asyncio.gather(feed(), *(run_stage(i, executor) for i in range(len(self.stages))))
+        return results
+#endregion Classes
@@ -0,0 +1,86 @@
+'''
+Append-only journal of the Genius processing loop in curate_data.py.
+
+Every processed track is written to a JSON Lines file as soon as it is done, so a run
+that crashes or is killed can be resumed with --resume without redoing finished tracks.
+'''
+
+import json
+import os
+
+#region Classes
+class CurationJournal:
+    """JSON Lines journal of accepted and skipped tracks."""
+
+    def __init__(self, journal_path, resume=False, sync_interval=10):
+        self.journal_path = journal_path
+        self.sync_interval = sync_interval
+        self.plan = None
+        self.incremental = None  # Whether the planned run was --incremental (None for journals from before this was recorded)
+        self.entries = {}
+        self.unsynced = 0
+
+        # Ensure the journal directory exists
+        journal_dir = os.path.dirname(journal_path)
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+
+        if resume:
+            self.load()
+            self.file = open(journal_path, 'a')
+        else:
+            # A fresh run starts a fresh journal
+            self.file = open(journal_path, 'w')
+
+    def load(self):
+        """Read the entries written by a previous run."""
+        if not os.path.exists(self.journal_path):
+            return
+
+        with open(self.journal_path, 'r') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be cut off if the run was killed while writing it
+                    continue
+
+                if entry['type'] == 'plan':
+                    self.plan = entry['track_ids']
+                    self.incremental = entry.get('incremental')
+                else:
+                    self.entries[entry['id']] = entry
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+
+        # Sync to disk periodically rather than on every track
+        self.unsynced += 1
+        if self.unsynced >= self.sync_interval:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+
+    def record_plan(self, track_ids, incremental=False):
+        """Record which tracks this run is going to process, and whether they get merged into the previous game data."""
+        self.plan = list(track_ids)
+        self.incremental = incremental
+        self.write({'type': 'plan', 'track_ids': self.plan, 'incremental': incremental})
+
+    def record_accepted(self, track_id, song):
+        """Record a track that made it into the game data."""
+        entry = {'type': 'accepted', 'id': track_id, 'song': song}
+        self.entries[track_id] = entry
+        self.write(entry)
+
+    def record_skipped(self, track_id, reason):
+        """Record a track that was skipped and why."""
+        entry = {'type': 'skipped', 'id': track_id, 'reason': reason}
+        self.entries[track_id] = entry
+        self.write(entry)
+
+    def close(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+#endregion Classes
@@ -0,0 +1,163 @@
+'''
+To run:
+python api/data_manifest.py            # Report what changed since the last publish
+python api/data_manifest.py --record   # Record the current data as published (run after uploading)
+
+Keeps data/dataManifest.json, a content-addressed record of the curated data files:
+a SHA-256 per file and per song (keyed by Spotify ID). Comparing the data files against
+it shows which files and songs were added, changed or removed since the last publish,
+so only those need to be uploaded.
+
+The censor step also keeps its own section in the manifest, recording the banned word
+list fingerprint and the hash of each uncensored song it censored, so songs that haven't
+changed can be copied from the previous gameData.json instead of being censored again.
+'''
+
+import argparse
+import hashlib
+import json
+import os
+
+from columnar_data import is_columnar, load_songs
+
+#region Global Variable Declarations
+data_manifest_json = 'data/dataManifest.json'
+tracked_files = ['data/topSongs.json', 'data/uncensoredGameData.json', 'data/gameData.json']
+MANIFEST_VERSION = 1
+#endregion Global Variable Declarations
+
+#region Functions
+def hash_bytes(content):
+    return hashlib.sha256(content).hexdigest()
+
+def hash_song(song):
+    """Hash a song's content independently of key order and formatting."""
+    return hash_bytes(json.dumps(song, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+def song_key(song):
+    """The Spotify ID of a song (`spotify_id` in game data, `id` in topSongs.json)."""
+    return song.get('spotify_id') or song.get('id')
+
+def fingerprint_banned_words(banned_words, overrides):
+    """Fingerprint the decoded banned word list and the censor overrides."""
+    content = json.dumps({'banned_words': banned_words, 'overrides': overrides}, sort_keys=True, ensure_ascii=False)
+    return hash_bytes(content.encode('utf-8'))
+
+def describe_file(file_path):
+    """Hash a data file and, if it's a list of songs, each song in it."""
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    entry = {'sha256': hash_bytes(content), 'bytes': len(content)}
+
+    try:
+        data = load_songs(content) if is_columnar(file_path) else json.loads(content)
+    except ValueError:
+        return entry
+    if isinstance(data, list):
+        entry['songs'] = {song_key(song): hash_song(song) for song in data if isinstance(song, dict)}
+    return entry
+
+def describe_files(file_paths):
+    """Describe each existing file, keyed by file name."""
+    return {os.path.basename(path): describe_file(path) for path in file_paths if os.path.exists(path)}
+
+def diff_songs(previous, current):
+    """Return the song IDs added, changed and removed between two {id: hash} maps."""
+    added = [key for key in current if key not in previous]
+    changed = [key for key in current if key in previous and previous[key] != current[key]]
+    removed = [key for key in previous if key not in current]
+    return {'added': added, 'changed': changed, 'removed': removed}
+
+def build_report(manifest, files):
+    """Compare the described files with the files recorded in the manifest."""
+    previous_files = manifest.get('files', {})
+    report = {'files': {}, 'upload': []}
+
+    for name, entry in files.items():
+        previous = previous_files.get(name)
+        if previous is None:
+            status = 'added'
+        elif previous['sha256'] != entry['sha256']:
+            status = 'changed'
+        else:
+            status = 'unchanged'
+        file_report = {'status': status}
+        if 'songs' in entry:
+            file_report['songs'] = diff_songs((previous or {}).get('songs', {}), entry['songs'])
+        report['files'][name] = file_report
+        if status != 'unchanged':
+            report['upload'].append(name)
+
+    for name in previous_files:
+        if name not in files:
+            report['files'][name] = {'status': 'removed'}
+
+    return report
+
+def load_manifest(manifest_path=data_manifest_json):
+    if not os.path.exists(manifest_path):
+        return {'version': MANIFEST_VERSION}
+    with open(manifest_path, 'r', encoding='utf-8') as file:
+        manifest = json.load(file)
+    # Start over rather than misread a manifest written in another format
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {'version': MANIFEST_VERSION}
+    return manifest
+
+def save_manifest(manifest, manifest_path=data_manifest_json):
+    directory = os.path.dirname(manifest_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=4, ensure_ascii=False)
+
+def record_published(file_paths, manifest_path=data_manifest_json):
+    """Record the current state of the files as the last published state."""
+    manifest = load_manifest(manifest_path)
+    manifest['files'] = describe_files(file_paths)
+    save_manifest(manifest, manifest_path)
+    return manifest
+
+def load_censor_state(manifest_path=data_manifest_json):
+    """Return the censor step's section of the manifest, or None if there isn't one."""
+    return load_manifest(manifest_path).get('censor')
+
+def save_censor_state(output_path, fingerprint, source_hashes, manifest_path=data_manifest_json):
+    """Record which uncensored songs produced output_path, and with which banned word list."""
+    manifest = load_manifest(manifest_path)
+    manifest['censor'] = {'output': output_path, 'banned_words': fingerprint, 'songs': source_hashes}
+    save_manifest(manifest, manifest_path)
+
+def print_report(report):
+    for name, file_report in report['files'].items():
+        line = f"{name}: {file_report['status']}"
+        songs = file_report.get('songs')
+        if songs:
+            line += f" ({len(songs['added'])} songs added, {len(songs['changed'])} changed, {len(songs['removed'])} removed)"
+        print(line)
+    if report['upload']:
+        print(f"\nFiles to upload: {', '.join(report['upload'])}")
+    else:
+        print("\nNothing changed since the last publish.")
+#endregion Functions
+
+def main():
+    parser = argparse.ArgumentParser(description='Report curated data changes since the last publish')
+    parser.add_argument('files', nargs='*', default=tracked_files, help='Data files to track')
+    parser.add_argument('--manifest', default=data_manifest_json, help='Path of the data manifest')
+    parser.add_argument('--record', action='store_true', help='Record the current files as published')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON, including song IDs')
+    args = parser.parse_args()
+
+    report = build_report(load_manifest(args.manifest), describe_files(args.files))
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print_report(report)
+
+    if args.record:
+        record_published(args.files, args.manifest)
+        print(f"Recorded the current data as published in {args.manifest}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+'''
+To run:
+python api/fake_services.py serve --songs 500 --latency 0.05 --error-rate 0.01 --rate-limit 10
+python api/curate_data.py --fake-services http://127.0.0.1:8765
+
+python api/fake_services.py drive --songs 300 --max-workers 4 8 16 --genius-workers 2 4 8
+
+Local stand-ins for the Spotify Web API, the Genius API and website, and the
+spotify-preview-finder lookups, with configurable latency, error rate and 429 rate
+limiting. `serve` runs them for curate_data.py --fake-services to point at, and
+`drive` times complete curation runs against them for each combination of worker
+and rate limiter settings. No network access or API keys are needed.
+'''
+
+import argparse
+import concurrent.futures
+import hashlib
+import html
+import itertools
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from benchmark import WORDS, generate_raw_lyrics
+
+#region Global Variable Declarations
+fake_services_script_path = os.path.abspath(__file__)
+curate_script_path = os.path.join(os.path.dirname(fake_services_script_path), 'curate_data.py')
+DEFAULT_PORT = 8765
+# Real service URL prefixes and the fake server paths they are redirected to
+SERVICE_PREFIXES = {
+    'https://api.spotify.com/': '/spotify/',
+    'https://api.genius.com/': '/genius-api/',
+    'https://genius.com/': '/genius-web/',
+}
+PREVIEW_WORKER_THREADS = 8  # Concurrent lookups per fake preview worker, like the async Node.js worker
+#endregion Global Variable Declarations
+
+#region Classes
+class RedirectAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter that sends requests for one URL prefix to another.
+
+    Requests still go through the adapter it replaces, so its connection pool,
+    retries and response cache apply as usual.
+    """
+
+    def __init__(self, prefix, target, adapter):
+        super().__init__()
+        self.prefix = prefix
+        self.target = target
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        request.url = self.target + request.url[len(self.prefix):]
+        return self.adapter.send(request, **kwargs)
+
+    def close(self):
+        self.adapter.close()
+
+class ServiceLimiter:
+    """Token bucket the fake server uses to decide when to answer 429."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.lock = Lock()
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+class FakeCatalog:
+    """The playlist and the Genius songs behind it, generated from a seed."""
+
+    def __init__(self, song_count, seed=0, miss_rate=0.05, no_chorus_rate=0.05):
+        rng = random.Random(seed)
+        self.tracks = []
+        self.lyrics = {}
+        self.search_index = {}
+        self.paths = {}
+        self.missing = set()
+        for i in range(song_count):
+            title = ' '.join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 3))) + f" {i}"
+            artist = rng.choice(WORDS).title() + ' ' + rng.choice(WORDS).title()
+            track = {'id': f"fake{i:06d}", 'name': title, 'artist': artist}
+            self.tracks.append(track)
+            self.search_index[f"{title} {artist}".lower()] = i
+
+            if rng.random() < miss_rate:
+                self.missing.add(i)
+            lyrics = generate_raw_lyrics(rng, [])
+            if rng.random() < no_chorus_rate:
+                lyrics = lyrics.replace('[Chorus]', '[Bridge]')
+            self.lyrics[i] = lyrics
+            self.paths[self.genius_song(i)['path']] = i
+
+    def genius_song(self, i):
+        """A Genius song object with the fields lyricsgenius reads."""
+        track = self.tracks[i]
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', f"{track['artist']} {track['name']}").strip('-') + '-lyrics'
+        artist = {
+            'id': 1000000 + i, 'name': track['artist'], 'api_path': f"/artists/{1000000 + i}",
+            'url': f"https://genius.com/artists/{track['artist'].replace(' ', '-')}",
+            'header_image_url': '', 'image_url': '', 'is_meme_verified': False, 'is_verified': False,
+        }
+        return {
+            'id': i + 1, 'title': track['name'], 'title_with_featured': track['name'],
+            'full_title': f"{track['name']} by {track['artist']}", 'artist_names': track['artist'],
+            'primary_artist': artist, 'featured_artists': [], 'stats': {'unreviewed_annotations': 0, 'hot': False},
+            'annotation_count': 0, 'api_path': f"/songs/{i + 1}", 'path': f"/{slug}",
+            'url': f"https://genius.com/{slug}", 'lyrics_state': 'complete', 'lyrics_owner_id': 1,
+            'pyongs_count': 0, 'header_image_url': '', 'header_image_thumbnail_url': '',
+            'song_art_image_url': '', 'song_art_image_thumbnail_url': '',
+        }
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    """Routes requests to the fake Spotify, Genius and preview finder endpoints."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        service = url.path.strip('/').split('/')[0] or 'other'
+        server.count(service, 'requests')
+
+        server.wait()
+        limiter = server.limiters.get(service)
+        if limiter and not limiter.allow():
+            server.count(service, 'rate_limited')
+            return self.send_json(429, {'meta': {'status': 429, 'message': 'Too many requests'}},
+                                  {'Retry-After': str(server.retry_after)})
+        if server.rng_random() < server.error_rate:
+            server.count(service, 'errors')
+            return self.send_json(500, {'meta': {'status': 500, 'message': 'Fake server error'}})
+
+        catalog = server.catalog
+        match = re.fullmatch(r'/spotify/v1/playlists/([^/]+)/tracks', url.path)
+        if match:
+            return self.send_json(200, self.playlist_page(match.group(1), int(query.get('offset', 0)), int(query.get('limit', 100))))
+
+        if url.path.startswith('/genius-web/api/search/'):
+            i = catalog.search_index.get(query.get('q', '').lower())
+            hits = [] if i is None or i in catalog.missing else [{'index': 'song', 'type': 'song', 'result': catalog.genius_song(i)}]
+            return self.send_json(200, {'meta': {'status': 200}, 'response': {'sections': [{'type': 'top_hit', 'hits': hits}]}})
+
+        match = re.fullmatch(r'/genius-api/songs/(\d+)', url.path)
+        if match and 0 < int(match.group(1)) <= len(catalog.tracks):
+            return self.send_json(200, {'meta': {'status': 200}, 'response': {'song': catalog.genius_song(int(match.group(1)) - 1)}})
+
+        i = catalog.paths.get(url.path[len('/genius-web'):]) if url.path.startswith('/genius-web/') else None
+        if i is not None:
+            return self.send_html(self.lyrics_page(i))
+
+        if url.path == '/preview':
+            i = catalog.search_index.get(query.get('q', '').lower())
+            preview_url = f"https://p.scdn.co/mp3-preview/{catalog.tracks[i]['id']}" if i is not None else ''
+            return self.send_json(200, {'preview_url': preview_url})
+
+        server.count(service, 'not_found')
+        self.send_json(404, {'meta': {'status': 404, 'message': 'Not found'}})
+
+    def playlist_page(self, playlist_id, offset, limit):
+        tracks = self.server.catalog.tracks
+        # A playlist ID like "200to350" holds that slice of the catalog, for overlapping playlists
+        match = re.fullmatch(r'(\d+)to(\d+)', playlist_id)
+        if match:
+            tracks = tracks[int(match.group(1)):int(match.group(2))]
+        items = [{'track': {'id': track['id'], 'name': track['name'], 'artists': [{'name': track['artist']}],
+                            'preview_url': None}}
+                 for track in tracks[offset:offset + limit]]
+        return {'items': items, 'total': len(tracks), 'limit': limit, 'offset': offset,
+                'next': None if offset + limit >= len(tracks) else f"offset={offset + limit}"}
+
+    def lyrics_page(self, i):
+        # lyricsgenius turns <br/> into newlines and reads the Lyrics__Container divs
+        lyrics = html.escape(self.server.catalog.lyrics[i]).replace('\n', '<br/>')
+        return f'<html><body><div data-lyrics-container="true" class="Lyrics__Container-sc-1">{lyrics}</div></body></html>'
+
+    def send_json(self, status, body, headers=None):
+        content = json.dumps(body).encode('utf-8')
+        if status == 200:
+            # Like the Spotify API, answer a matching If-None-Match with an empty 304
+            etag = f'"{hashlib.sha1(content).hexdigest()}"'
+            headers = {**(headers or {}), 'ETag': etag}
+            if self.headers.get('If-None-Match') == etag:
+                self.server.count(urlparse(self.path).path.strip('/').split('/')[0], 'not_modified')
+                return self.send_body(304, b'', 'application/json', headers)
+        self.send_body(status, content, 'application/json', headers)
+
+    def send_html(self, page):
+        self.send_body(200, page.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def send_body(self, status, content, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+class FakeServices(ThreadingHTTPServer):
+    """Fake Spotify, Genius and preview finder endpoints on a local port."""
+
+    daemon_threads = True
+
+    def __init__(self, catalog, port=DEFAULT_PORT, latency=0.05, jitter=0.5, error_rate=0.0,
+                 rate_limit=None, burst=5, retry_after=1, seed=0):
+        super().__init__(('127.0.0.1', port), FakeServiceHandler)
+        self.catalog = catalog
+        self.latency = latency  # Mean seconds before answering
+        self.jitter = jitter  # Latency varies by up to this fraction either way
+        self.error_rate = error_rate  # Fraction of requests answered with a 500
+        self.retry_after = retry_after  # Seconds sent in Retry-After with each 429
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.rng = random.Random(seed)
+        self.lock = Lock()
+        self.reset()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset(self):
+        """Clear the counters and refill the rate limits between runs."""
+        with self.lock:
+            self.counters = {}
+            # Each service gets its own requests-per-second limit, answering 429 above it
+            self.limiters = {service: ServiceLimiter(self.rate_limit, self.burst)
+                             for service in ('spotify', 'genius-api', 'genius-web', 'preview')} if self.rate_limit else {}
+
+    def count(self, service, counter):
+        with self.lock:
+            counters = self.counters.setdefault(service, {})
+            counters[counter] = counters.get(counter, 0) + 1
+
+    def rng_random(self):
+        with self.lock:
+            return self.rng.random()
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency * (1 + self.jitter * (2 * self.rng_random() - 1)))
+
+    def stats(self):
+        with self.lock:
+            return {service: dict(counters) for service, counters in self.counters.items()}
+
+    def start(self):
+        Thread(target=self.serve_forever, daemon=True).start()
+        return self
+#endregion Classes
+
+#region Functions
+def redirect_to_fake_services(session, base_url):
+    """Send a requests session's Spotify and Genius requests to the fake services at base_url."""
+    for prefix, path in SERVICE_PREFIXES.items():
+        session.mount(prefix, RedirectAdapter(prefix, base_url.rstrip('/') + path, session.get_adapter(prefix)))
+    return session
+
+def fake_preview_command(base_url):
+    """Command for preview lookups against the fake services, in place of the Node.js script."""
+    return [sys.executable, fake_services_script_path, 'preview', '--url', base_url]
+
+def lookup_preview(session, base_url, query):
+    response = session.get(base_url.rstrip('/') + '/preview', params={'q': query}, timeout=30)
+    response.raise_for_status()
+    return response.json().get('preview_url') or ''
+
+def run_preview(base_url, query=None):
+    """Answer preview queries like get_preview_url.js: one from the command line, or many as a worker."""
+    session = requests.Session()
+    if query is not None:
+        try:
+            print(lookup_preview(session, base_url, query))
+        except requests.exceptions.RequestException as e:
+            print(e, file=sys.stderr)
+            print('')
+        return
+
+    write_lock = Lock()
+
+    def answer(request):
+        try:
+            preview_url = lookup_preview(session, base_url, request['query'])
+        except requests.exceptions.RequestException as e:
+            print(e, file=sys.stderr)
+            preview_url = ''
+        with write_lock:
+            sys.stdout.write(json.dumps({'id': request['id'], 'preview_url': preview_url}) + '\n')
+            sys.stdout.flush()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=PREVIEW_WORKER_THREADS) as executor:
+        for line in sys.stdin:
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Invalid request: {line}", file=sys.stderr)
+                continue
+            executor.submit(answer, request)
+
+def run_curation(base_url, max_workers, genius_workers, genius_rate, preview_workers, verbose=False):
+    """Run curate_data.py against the fake services in a scratch directory.
+
+    Returns (seconds, songs in the game data).
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        command = [sys.executable, curate_script_path, '--fake-services', base_url, '--no-lyrics-cache',
+                   '--max-workers', str(max_workers), '--genius-workers', str(genius_workers),
+                   '--genius-rate', str(genius_rate), '--preview-workers', str(preview_workers)]
+        started_at = time.perf_counter()
+        result = subprocess.run(command, cwd=work_dir, capture_output=not verbose, text=True)
+        elapsed = time.perf_counter() - started_at
+        if result.returncode != 0:
+            raise RuntimeError(f"curate_data.py exited with code {result.returncode}:\n{result.stderr or ''}")
+
+        with open(os.path.join(work_dir, 'data', 'uncensoredGameData.json'), 'r', encoding='utf-8') as file:
+            song_count = len(json.load(file))
+    return elapsed, song_count
+
+def drive(services, max_workers, genius_workers, genius_rates, preview_workers, verbose=False):
+    """Time a curation run for every combination of settings and print a table."""
+    print(f"\n=== Curation runs against {services.url} ({len(services.catalog.tracks)} tracks) ===\n")
+    print(f"{'Max workers':>11}  {'Genius workers':>14}  {'Genius rate':>11}  {'Seconds':>8}  {'Songs':>6}  "
+          f"{'Requests':>8}  {'429s':>5}  {'Errors':>6}")
+
+    results = []
+    for workers, lookups, rate in itertools.product(max_workers, genius_workers, genius_rates):
+        services.reset()
+        seconds, song_count = run_curation(services.url, workers, lookups, rate, preview_workers, verbose)
+        stats = services.stats()
+        totals = {counter: sum(counters.get(counter, 0) for counters in stats.values())
+                  for counter in ('requests', 'rate_limited', 'errors')}
+        results.append({'max_workers': workers, 'genius_workers': lookups, 'genius_rate': rate,
+                        'seconds': seconds, 'songs': song_count, 'services': stats})
+        print(f"{workers:>11}  {lookups:>14}  {rate:>11}  {seconds:>8.1f}  {song_count:>6}  "
+              f"{totals['requests']:>8}  {totals['rate_limited']:>5}  {totals['errors']:>6}")
+    return results
+#endregion Functions
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Spotify, Genius and preview finder services for offline load testing')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_server_arguments(subparser):
+        subparser.add_argument('--songs', type=int, default=500, help='Number of tracks in the fake playlist')
+        subparser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on (0 for any free port)')
+        subparser.add_argument('--latency', type=float, default=0.05, help='Mean seconds before each response')
+        subparser.add_argument('--jitter', type=float, default=0.5, help='Fraction the latency varies by either way')
+        subparser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 500')
+        subparser.add_argument('--rate-limit', type=float, default=None,
+                               help='Requests per second each service allows before answering 429 (unlimited by default)')
+        subparser.add_argument('--burst', type=int, default=5, help='Requests each service allows in a burst')
+        subparser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with each 429')
+        subparser.add_argument('--miss-rate', type=float, default=0.05, help='Fraction of tracks Genius has no result for')
+        subparser.add_argument('--no-chorus-rate', type=float, default=0.05, help='Fraction of lyrics without a chorus')
+        subparser.add_argument('--seed', type=int, default=0, help='Seed for the fake catalog and responses')
+
+    serve_parser = subparsers.add_parser('serve', help='Run the fake services until interrupted')
+    add_server_arguments(serve_parser)
+
+    drive_parser = subparsers.add_parser('drive', help='Time curation runs against the fake services')
+    add_server_arguments(drive_parser)
+    drive_parser.add_argument('--max-workers', type=int, nargs='+', default=[8], help='MAX_WORKERS settings to try')
+    drive_parser.add_argument('--genius-workers', type=int, nargs='+', default=[4], help='Concurrent Genius lookups to try')
+    drive_parser.add_argument('--genius-rate', type=float, nargs='+', default=[2.0], help='Initial Genius rates to try')
+    drive_parser.add_argument('--preview-workers', type=int, default=2, help='Fake preview worker processes per run')
+    drive_parser.add_argument('--report', help='Also write the results to this JSON file')
+    drive_parser.add_argument('--verbose', action='store_true', help="Show curate_data.py's output")
+
+    preview_parser = subparsers.add_parser('preview', help='Look up preview URLs like get_preview_url.js')
+    preview_parser.add_argument('--url', default=f"http://127.0.0.1:{DEFAULT_PORT}", help='Base URL of the fake services')
+    preview_parser.add_argument('--worker', action='store_true', help='Answer line-delimited JSON queries on stdin')
+    preview_parser.add_argument('query', nargs='?', help='Search query when not running as a worker')
+    args = parser.parse_args()
+
+    if args.command == 'preview':
+        run_preview(args.url, None if args.worker else args.query or '')
+        return
+
+    catalog = FakeCatalog(args.songs, args.seed, args.miss_rate, args.no_chorus_rate)
+    services = FakeServices(catalog, args.port, args.latency, args.jitter, args.error_rate,
+                            args.rate_limit, args.burst, args.retry_after, args.seed)
+
+    if args.command == 'serve':
+        print(f"Fake services listening on {services.url} with {args.songs} tracks")
+        print(f"Run: python api/curate_data.py --fake-services {services.url}")
+        try:
+            services.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            services.server_close()
+        return
+
+    services.start()
+    try:
+        results = drive(services, args.max_workers, args.genius_workers, args.genius_rate, args.preview_workers, args.verbose)
+    finally:
+        services.shutdown()
+        services.server_close()
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+        print(f"\nSaved results to {args.report}")
+
+if __name__ == "__main__":
+    main()
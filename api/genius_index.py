@@ -0,0 +1,172 @@
+'''
+Local index of the Genius songs that Spotify tracks have been resolved to.
+
+Spotify titles often carry decorations that Genius titles don't ("Song - Remastered
+2011", "Song (feat. X)"), which lead Genius searches to miss or pick the wrong song.
+Titles are cleaned up before searching, and every track that a search resolves is
+recorded here under its Spotify ID and a normalized title/artist key. Later runs
+fetch known songs straight from their Genius ID, skipping the search request. A track
+with a new Spotify ID (e.g. a re-release) is matched to a known song by the same
+artist when its normalized title is close enough to a recorded one by trigram
+similarity. Since similar titles can still be different songs ("Mood" and "Moon"),
+such a fuzzy match is only used if the fetched Genius song has the track's title.
+'''
+
+import re
+import time
+import unicodedata
+from collections import Counter
+
+from sqlite_store import SqliteStore
+
+#region Global Variable Declarations
+MIN_SIMILARITY = 0.85  # Dice coefficient of title trigrams needed for a fuzzy match
+# Spotify title decorations that aren't part of the song's name on Genius
+TITLE_DECORATION_PATTERNS = [
+    # "Song - Remastered 2011", "Song - 2011 Remaster", "Song - Radio Edit", "Song - From "Film""
+    re.compile(r'\s+-\s+(?:(?:\d{4}\s+)?(?:digital(?:ly)?\s+)?remaster(?:ed)?(?:\s+\d{4})?(?:\s+version)?|radio edit|single version'
+               r'|album version|mono|stereo|bonus track|from\s.*)\s*$', re.IGNORECASE),
+    # "Song (Remastered 2011)", "Song [feat. X]", "Song (with X)"
+    re.compile(r'\s*[(\[](?:feat\.?|ft\.?|featuring|with)\s[^)\]]*[)\]]', re.IGNORECASE),
+    re.compile(r'\s*[(\[](?:(?:\d{4}\s+)?remaster(?:ed)?(?:\s+\d{4})?(?:\s+version)?|radio edit|single version|album version|mono|stereo)[)\]]',
+               re.IGNORECASE),
+    # "Song feat. X"
+    re.compile(r'\s+(?:feat\.?|ft\.?|featuring)\s.*$', re.IGNORECASE),
+]
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+WHITESPACE_PATTERN = re.compile(r'\s+')
+#endregion Global Variable Declarations
+
+#region Functions
+def clean_title(title):
+    """Remove Spotify-only decorations from a title, keeping its case, for searching Genius."""
+    cleaned = title
+    for pattern in TITLE_DECORATION_PATTERNS:
+        cleaned = pattern.sub('', cleaned)
+    return cleaned.strip() or title
+
+def fold_text(text):
+    """Lowercase text without accents, punctuation or repeated whitespace."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(character for character in text if not unicodedata.combining(character))
+    text = PUNCTUATION_PATTERN.sub(' ', text.lower().replace('&', ' and '))
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+def normalize_artist(artist):
+    artist = fold_text(artist)
+    return artist[4:] if artist.startswith('the ') else artist
+
+def normalize_title(title):
+    return fold_text(clean_title(title))
+
+def normalize_key(title, artist):
+    """Key that matches the same song across title decorations, case, accents and punctuation."""
+    return f"{normalize_title(title)}|{normalize_artist(artist)}"
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+#endregion Functions
+
+#region Classes
+class GeniusIndex(SqliteStore):
+    """SQLite-backed map of Spotify tracks to Genius song IDs, with fuzzy lookups by title and artist."""
+
+    TABLE = 'resolved'
+    KEY = 'spotify_id'
+    COLUMNS = '''
+        spotify_id TEXT PRIMARY KEY,
+        song_key TEXT NOT NULL,
+        genius_id INTEGER NOT NULL,
+        resolved_at REAL NOT NULL'''
+
+    def __init__(self, db_path, min_similarity=MIN_SIMILARITY):
+        super().__init__(db_path)
+        self.min_similarity = min_similarity
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+        # Lookups are served from memory: by Spotify ID, by key, and by key trigram
+        self.by_spotify_id = {}
+        self.by_key = {}
+        self.key_trigrams = {}
+        self.postings = {}
+        for spotify_id, key, genius_id in self.connection.execute(
+                'SELECT spotify_id, song_key, genius_id FROM resolved ORDER BY resolved_at'):
+            self.add(spotify_id, key, genius_id)
+
+    def add(self, spotify_id, key, genius_id):
+        self.by_spotify_id[spotify_id] = genius_id
+        if key not in self.by_key:
+            # Artists have to match exactly, so only the title is compared by trigrams
+            self.key_trigrams[key] = trigrams(key.rpartition('|')[0])
+            for trigram in self.key_trigrams[key]:
+                self.postings.setdefault(trigram, set()).add(key)
+        self.by_key[key] = genius_id
+
+    def closest_key(self, key):
+        """Return the indexed key by the same artist whose title is most similar to key's, if it is similar enough."""
+        title, _, artist = key.rpartition('|')
+        query = trigrams(title)
+        shared = Counter(candidate for trigram in query for candidate in self.postings.get(trigram, ()))
+        best_key, best_similarity = None, self.min_similarity
+        for candidate, count in shared.items():
+            if candidate.rpartition('|')[2] != artist:
+                continue
+            similarity = 2 * count / (len(query) + len(self.key_trigrams[candidate]))
+            if similarity >= best_similarity:
+                best_key, best_similarity = candidate, similarity
+        return best_key
+
+    def lookup(self, spotify_id, title, artist):
+        """Return (Genius ID, fuzzy) for the song a track was resolved to before, or (None, False).
+
+        fuzzy is True when the ID comes from a different title by the same artist, in which
+        case the caller should check that the fetched song really has the track's title.
+        """
+        with self.lock:
+            fuzzy = False
+            genius_id = self.by_spotify_id.get(spotify_id)
+            if genius_id is None:
+                key = normalize_key(title, artist)
+                genius_id = self.by_key.get(key)
+                if genius_id is None:
+                    closest = self.closest_key(key)
+                    if closest is None:
+                        self.misses += 1
+                        return None, False
+                    genius_id = self.by_key[closest]
+                    fuzzy = True
+                    self.fuzzy_hits += 1
+            self.hits += 1
+            return genius_id, fuzzy
+
+    def put(self, spotify_id, title, artist, genius_id):
+        """Record the Genius song a track was resolved to."""
+        key = normalize_key(title, artist)
+        with self.lock:
+            self.add(spotify_id, key, genius_id)
+            self.store(spotify_id=spotify_id, song_key=key, genius_id=genius_id, resolved_at=time.time())
+            self.connection.commit()
+
+    def forget(self, genius_id):
+        """Drop every track resolved to a Genius song that could no longer be fetched."""
+        with self.lock:
+            self.by_spotify_id = {spotify_id: known_id for spotify_id, known_id in self.by_spotify_id.items() if known_id != genius_id}
+            for key in [key for key, known_id in self.by_key.items() if known_id == genius_id]:
+                del self.by_key[key]
+                for trigram in self.key_trigrams.pop(key):
+                    self.postings[trigram].discard(key)
+            self.connection.execute('DELETE FROM resolved WHERE genius_id = ?', (genius_id,))
+            self.connection.commit()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'fuzzy_hits': self.fuzzy_hits,
+                'misses': self.misses,
+                'entries': len(self.by_spotify_id),
+            }
+#endregion Classes
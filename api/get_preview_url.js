@@ -1,26 +1,49 @@
-
 // Script to get preview URL for a song using spotify-preview-finder
 require('dotenv').config();
 const spotifyPreviewFinder = require('spotify-preview-finder');
 
-// Get song name and artist from command line arguments
-const songQuery = process.argv[2];
-
-async function getPreviewUrl() {
+// Find the preview URL for a search query, or an empty string if there isn't one
+async function findPreviewUrl(songQuery) {
   try {
     const result = await spotifyPreviewFinder(songQuery, 1);
     
     if (result.success && result.results.length > 0) {
       // Return the first preview URL
-      const previewUrl = result.results[0].previewUrls[0];
-      console.log(previewUrl);
-    } else {
-      console.log('');  // Empty string if no preview URL found
+      return result.results[0].previewUrls[0] || '';
     }
+    return '';  // Empty string if no preview URL found
   } catch (error) {
     console.error(error.message);
-    console.log('');  // Empty string on error
+    return '';  // Empty string on error
   }
 }
 
-getPreviewUrl();
+// Get song name and artist from command line arguments
+async function getPreviewUrl(songQuery) {
+  console.log(await findPreviewUrl(songQuery));
+}
+
+// Worker mode: answer many queries over stdin/stdout, one JSON object per line
+// Request: {"id": 1, "query": "Song Artist"}  Response: {"id": 1, "preview_url": "..."}
+function runWorker() {
+  const readline = require('readline');
+  const lines = readline.createInterface({ input: process.stdin });
+
+  lines.on('line', async (line) => {
+    let request;
+    try {
+      request = JSON.parse(line);
+    } catch (error) {
+      console.error(`Invalid request: ${line}`);
+      return;
+    }
+    const previewUrl = await findPreviewUrl(request.query);
+    process.stdout.write(JSON.stringify({ id: request.id, preview_url: previewUrl }) + '\n');
+  });
+}
+
+if (process.argv[2] === '--worker') {
+  runWorker();
+} else {
+  getPreviewUrl(process.argv[2]);
+}
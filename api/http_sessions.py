@@ -0,0 +1,149 @@
+'''
+Pooled HTTP sessions for the Spotify and Genius clients.
+
+Each client gets one requests session for the whole run, with a connection pool
+sized for the threads that share it, so concurrent lookups and retries reuse
+kept-alive connections instead of opening a new one (and doing a new TLS
+handshake) per request.
+
+JSON responses that carry an ETag or Last-Modified header are kept in an on-disk
+cache. Requesting the same URL again sends If-None-Match / If-Modified-Since, and
+if the server answers 304 Not Modified the cached body is used instead of being
+downloaded again.
+'''
+
+import json
+import time
+import zlib
+
+import requests
+from urllib3.util.retry import Retry
+
+from sqlite_store import SqliteStore
+
+#region Global Variable Declarations
+POOL_HOSTS = 4  # Hosts each session keeps a connection pool for (e.g. api.genius.com and genius.com)
+#endregion Global Variable Declarations
+
+#region Classes
+class HttpCache(SqliteStore):
+    """SQLite-backed store of JSON responses and their validators, with least-recently-used eviction."""
+
+    TABLE = 'responses'
+    KEY = 'url'
+    COLUMNS = '''
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        headers TEXT NOT NULL,
+        content BLOB NOT NULL,
+        accessed_at REAL NOT NULL'''
+    ACCESSED = 'accessed_at'
+
+    def __init__(self, db_path, max_entries=5000):
+        super().__init__(db_path, max_entries)
+        self.revalidated = 0  # 304s answered from the cache
+        self.stored = 0
+
+    def get(self, url):
+        """Return (etag, last_modified) for a cached URL, or None."""
+        with self.lock:
+            return self.row(url, 'etag, last_modified')
+
+    def load(self, url):
+        """Return (headers, content) for a cached URL and mark it as recently used, or None."""
+        with self.lock:
+            row = self.row(url, 'headers, content')
+            if row is None:
+                return None
+            self.touch(url)
+            self.connection.commit()
+            self.revalidated += 1
+            return json.loads(row[0]), zlib.decompress(row[1])
+
+    def put(self, url, response):
+        """Store a response body along with its validators."""
+        headers = {name: response.headers[name] for name in ('Content-Type', 'ETag', 'Last-Modified') if name in response.headers}
+        with self.lock:
+            self.store(url=url, etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'),
+                       headers=json.dumps(headers), content=zlib.compress(response.content), accessed_at=time.time())
+            self.connection.commit()
+            self.stored += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'revalidated': self.revalidated,
+                'stored': self.stored,
+                'evictions': self.evictions,
+                'entries': self.count(),
+            }
+
+    def close(self):
+        # Drop the least recently used responses beyond max_entries
+        with self.lock:
+            self.evict()
+            self.connection.commit()
+        super().close()
+
+class ConditionalAdapter(requests.adapters.HTTPAdapter):
+    """Pooled transport adapter that revalidates cached JSON responses with ETag / Last-Modified."""
+
+    def __init__(self, http_cache=None, **kwargs):
+        self.http_cache = http_cache
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if self.http_cache is None or request.method != 'GET' or kwargs.get('stream'):
+            return super().send(request, **kwargs)
+
+        validators = self.http_cache.get(request.url)
+        if validators:
+            etag, last_modified = validators
+            if etag and 'If-None-Match' not in request.headers:
+                request.headers['If-None-Match'] = etag
+            if last_modified and 'If-Modified-Since' not in request.headers:
+                request.headers['If-Modified-Since'] = last_modified
+
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and validators:
+            cached = self.http_cache.load(request.url)
+            if cached:
+                # Hand the caller the cached body as if it had been downloaded again
+                headers, content = cached
+                response.status_code = 200
+                response.reason = 'OK'
+                response.headers.update(headers)
+                response._content = content
+        elif response.status_code == 200 and self.is_cacheable(response):
+            self.http_cache.put(request.url, response)
+        return response
+
+    @staticmethod
+    def is_cacheable(response):
+        headers = response.headers
+        return (('ETag' in headers or 'Last-Modified' in headers)
+                and 'json' in headers.get('Content-Type', '')
+                and 'no-store' not in headers.get('Cache-Control', ''))
+#endregion Classes
+
+#region Functions
+def mount_pooled_adapter(session, pool_size, http_cache=None, max_retries=0):
+    """Give a session a keep-alive connection pool of pool_size connections per host.
+
+    Size the pool to the number of threads sharing the session, so none of them
+    has to open a throwaway connection when the pool is full.
+    """
+    adapter = ConditionalAdapter(http_cache, pool_connections=POOL_HOSTS, pool_maxsize=pool_size, max_retries=max_retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def create_pooled_session(pool_size, http_cache=None, max_retries=0):
+    return mount_pooled_adapter(requests.Session(), pool_size, http_cache, max_retries)
+
+def spotify_retry():
+    """The retry policy spotipy uses for the sessions it builds itself."""
+    return Retry(total=3, connect=None, read=False, allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+                 status=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+#endregion Functions
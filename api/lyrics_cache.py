@@ -0,0 +1,100 @@
+'''
+On-disk cache of raw Genius lyrics, keyed by Spotify track ID.
+
+Used by curate_data.py so that reruns only search Genius for tracks that are new
+or whose cached lyrics have expired.
+'''
+
+import time
+
+from sqlite_store import SqliteStore
+
+#region Classes
+class CachedSong:
+    """Stand-in for a lyricsgenius Song built from a cache entry."""
+    def __init__(self, genius_id, title, artist, url, lyrics):
+        self.id = genius_id
+        self.title = title
+        self.artist = artist
+        self.url = url
+        self.lyrics = lyrics
+
+    def __str__(self):
+        return f'"{self.title}" by {self.artist} (cached):\n    {self.lyrics[:100]}...'
+
+class LyricsCache(SqliteStore):
+    """SQLite-backed lyrics cache with a TTL and least-recently-used eviction."""
+
+    TABLE = 'lyrics'
+    KEY = 'spotify_id'
+    COLUMNS = '''
+        spotify_id TEXT PRIMARY KEY,
+        genius_id INTEGER,
+        title TEXT,
+        artist TEXT,
+        url TEXT,
+        lyrics TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        accessed_at REAL NOT NULL'''
+    ACCESSED = 'accessed_at'
+
+    def __init__(self, db_path, ttl_seconds=30 * 24 * 60 * 60, max_entries=5000):
+        super().__init__(db_path, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, spotify_id):
+        """Return the cached song for a track, or None if it is missing or expired."""
+        with self.lock:
+            row = self.row(spotify_id, 'genius_id, title, artist, url, lyrics, fetched_at')
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            now = time.time()
+            if self.ttl_seconds is not None and now - row[5] > self.ttl_seconds:
+                # Expired entries are dropped so the track gets fetched again
+                self.delete(spotify_id)
+                self.connection.commit()
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self.touch(spotify_id, now)
+            self.connection.commit()
+            self.hits += 1
+            return CachedSong(row[0], row[1], row[2], row[3], row[4])
+
+    def peek(self, spotify_id):
+        """Return the cached raw lyrics for a track without counting a hit or a miss, or None."""
+        with self.lock:
+            row = self.row(spotify_id, 'lyrics, fetched_at')
+        if row is None or (self.ttl_seconds is not None and time.time() - row[1] > self.ttl_seconds):
+            return None
+        return row[0]
+
+    def put(self, spotify_id, genius_song):
+        """Store the raw lyrics and metadata of a Genius song for a track."""
+        now = time.time()
+        with self.lock:
+            self.store(spotify_id=spotify_id, genius_id=getattr(genius_song, 'id', None), title=genius_song.title,
+                       artist=genius_song.artist, url=getattr(genius_song, 'url', None), lyrics=genius_song.lyrics,
+                       fetched_at=now, accessed_at=now)
+            self.evict()
+            self.connection.commit()
+
+    def stats(self):
+        """Return the hit/miss counters for this run."""
+        with self.lock:
+            entries = self.count()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evictions': self.evictions,
+            'entries': entries,
+        }
+#endregion Classes
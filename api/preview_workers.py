@@ -0,0 +1,165 @@
+'''
+Pool of long-lived Node.js processes for looking up preview URLs.
+
+Each worker runs `node api/get_preview_url.js --worker` and answers many queries over
+line-delimited JSON on stdin/stdout, so module loading happens once per worker instead
+of once per track. Requests are matched to responses by ID, time out individually, and
+crashed or hung workers are restarted.
+'''
+
+import concurrent.futures
+import itertools
+import json
+import subprocess
+from threading import Lock, Thread
+
+#region Classes
+class WorkerCrashed(Exception):
+    """Raised for requests that were in flight when a worker process exited."""
+
+class PreviewWorker:
+    """A single Node.js worker process and the requests waiting on it."""
+
+    def __init__(self, command):
+        self.command = command
+        self.lock = Lock()
+        self.pending = {}
+        self.timeouts = 0  # Consecutive timed out requests
+        self.process = None
+        self.start()
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, encoding='utf-8', bufsize=1)
+        self.timeouts = 0
+        Thread(target=self.read_responses, args=(self.process,), daemon=True).start()
+
+    def restart(self):
+        """Replace the process, failing anything still waiting on the old one."""
+        self.process.kill()
+        self.process.wait()
+        with self.lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for future in pending:
+            future.set_exception(WorkerCrashed("Preview worker was restarted"))
+        self.start()
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def read_responses(self, process):
+        """Hand each response line to the request waiting for it."""
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+                request_id = response['id']
+            except (json.JSONDecodeError, KeyError, TypeError):
+                # Anything else the Node script prints isn't part of the protocol
+                continue
+            with self.lock:
+                future = self.pending.pop(request_id, None)
+            if future:
+                future.set_result(response.get('preview_url') or '')
+
+        # stdout closed, so the process is gone and nothing pending will be answered
+        with self.lock:
+            if process is self.process:
+                pending = list(self.pending.values())
+                self.pending.clear()
+            else:
+                pending = []
+        for future in pending:
+            future.set_exception(WorkerCrashed(f"Preview worker exited with code {process.wait()}"))
+
+    def submit(self, request_id, query):
+        future = concurrent.futures.Future()
+        with self.lock:
+            self.pending[request_id] = future
+            try:
+                self.process.stdin.write(json.dumps({'id': request_id, 'query': query}) + '\n')
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError) as e:
+                self.pending.pop(request_id, None)
+                future.set_exception(WorkerCrashed(str(e)))
+        return future
+
+    def forget(self, request_id):
+        with self.lock:
+            self.pending.pop(request_id, None)
+
+    def load(self):
+        with self.lock:
+            return len(self.pending)
+
+    def stop(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+class PreviewWorkerPool:
+    """Spreads preview URL queries over a few long-lived Node.js workers."""
+
+    def __init__(self, command, size=2, timeout=30, max_timeouts=3):
+        self.command = command
+        self.timeout = timeout  # Seconds to wait for a single query
+        self.max_timeouts = max_timeouts  # Consecutive timeouts before a worker is considered hung
+        self.lock = Lock()
+        self.request_ids = itertools.count(1)
+        self.restarts = 0
+        self.timeouts = 0
+        self.workers = [PreviewWorker(command) for _ in range(size)]
+
+    def get_worker(self):
+        """Pick the least busy worker, restarting any that have died."""
+        with self.lock:
+            for worker in self.workers:
+                if not worker.is_alive():
+                    worker.restart()
+                    self.restarts += 1
+            return min(self.workers, key=lambda worker: worker.load())
+
+    def restart_worker(self, worker):
+        with self.lock:
+            worker.restart()
+            self.restarts += 1
+
+    def get_preview_url(self, query, retries=1):
+        """Return the preview URL for a query, an empty string if none was found,
+        or None if the workers failed to answer."""
+        for attempt in range(retries + 1):
+            worker = self.get_worker()
+            request_id = next(self.request_ids)
+            future = worker.submit(request_id, query)
+            try:
+                preview_url = future.result(timeout=self.timeout)
+                worker.timeouts = 0
+                return preview_url
+            except concurrent.futures.TimeoutError:
+                worker.forget(request_id)
+                with self.lock:
+                    self.timeouts += 1
+                worker.timeouts += 1
+                if worker.timeouts >= self.max_timeouts:
+                    # The worker has stopped answering, so replace it
+                    self.restart_worker(worker)
+                return None
+            except WorkerCrashed:
+                # The next attempt restarts the worker and tries again
+                continue
+        return None
+
+    def stats(self):
+        with self.lock:
+            return {'workers': len(self.workers), 'restarts': self.restarts, 'timeouts': self.timeouts}
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+#endregion Classes
@@ -0,0 +1,110 @@
+'''
+To run:
+python api/publish.py
+
+Prepares data files for the CDN. Each JSON file is minified and written under a
+content-hashed name, along with gzip and Brotli precompressed copies, and
+manifest.json maps each logical name (e.g. gameData.json) to its current files.
+Hashed files never change, so the CDN can cache them forever; only the small
+manifest needs a short cache lifetime.
+'''
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+
+import brotli
+
+#region Global Variable Declarations
+publish_dir = 'data/publish'
+manifest_name = 'manifest.json'
+HASH_LENGTH = 16  # Hex characters of the SHA-256 content hash used in file names
+#endregion Global Variable Declarations
+
+#region Functions
+def minify_json(data):
+    """Serialize data as compact UTF-8 JSON."""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def write_if_missing(file_path, content):
+    """Write a content-addressed file unless it already exists."""
+    if os.path.exists(file_path):
+        return False
+    with open(file_path, 'wb') as file:
+        file.write(content)
+    return True
+
+def publish_json(logical_name, data, output_dir=publish_dir):
+    """Write minified, gzip and Brotli copies of data under content-hashed names.
+
+    Returns the manifest entry for the file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    content = minify_json(data)
+    digest = hashlib.sha256(content).hexdigest()
+    stem, extension = os.path.splitext(logical_name)
+    file_name = f"{stem}.{digest[:HASH_LENGTH]}{extension}"
+
+    entry = {
+        'file': file_name,
+        'sha256': digest,
+        'bytes': len(content),
+    }
+    write_if_missing(os.path.join(output_dir, file_name), content)
+
+    # mtime=0 keeps the gzip output identical for identical content
+    gzip_content = gzip.compress(content, compresslevel=9, mtime=0)
+    write_if_missing(os.path.join(output_dir, file_name + '.gz'), gzip_content)
+    entry['gzip'] = {'file': file_name + '.gz', 'bytes': len(gzip_content)}
+
+    brotli_content = brotli.compress(content, quality=11)
+    write_if_missing(os.path.join(output_dir, file_name + '.br'), brotli_content)
+    entry['br'] = {'file': file_name + '.br', 'bytes': len(brotli_content)}
+
+    return entry
+
+def load_manifest(output_dir=publish_dir):
+    manifest_path = os.path.join(output_dir, manifest_name)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def save_manifest(manifest, output_dir=publish_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, manifest_name), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=4, sort_keys=True)
+
+def publish_files(file_paths, output_dir=publish_dir):
+    """Publish JSON files and update the manifest with their current hashed names."""
+    manifest = load_manifest(output_dir)
+    for file_path in file_paths:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        logical_name = os.path.basename(file_path)
+        manifest[logical_name] = publish_json(logical_name, data, output_dir)
+
+        entry = manifest[logical_name]
+        sizes = (f"{os.path.getsize(file_path)} bytes -> {entry['bytes']} minified, {entry['gzip']['bytes']} gzip, "
+                 f"{entry['br']['bytes']} brotli")
+        print(f"Published {file_path} as {entry['file']} ({sizes})")
+
+    save_manifest(manifest, output_dir)
+    return manifest
+#endregion Functions
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish minified, precompressed, content-hashed data files')
+    parser.add_argument('files', nargs='*', default=['data/gameData.json'],
+                        help='JSON files to publish (defaults to data/gameData.json)')
+    parser.add_argument('--output-dir', default=publish_dir, help='Directory for the published files and manifest')
+    args = parser.parse_args()
+
+    publish_files(args.files, args.output_dir)
+    print(f"Saved manifest to {os.path.join(args.output_dir, manifest_name)}")
+
+if __name__ == "__main__":
+    main()
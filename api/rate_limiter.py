@@ -0,0 +1,130 @@
+'''
+Adaptive rate limiting for Genius API requests.
+
+A token bucket shared by all lookup threads. The rate goes up slowly while requests
+succeed and is cut whenever the API answers 429, honoring its Retry-After header.
+'''
+
+import time
+from email.utils import parsedate_to_datetime
+from threading import Condition
+
+import requests
+
+#region Functions
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or an HTTP date) into seconds to wait."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+#endregion Functions
+
+#region Classes
+class AdaptiveRateLimiter:
+    """Token bucket whose rate adapts to 429 responses."""
+
+    def __init__(self, rate=2.0, min_rate=0.1, max_rate=10.0, burst=5, increase=0.05, decrease=0.5):
+        self.rate = rate  # Requests per second currently allowed
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst  # Max number of tokens that can build up
+        self.increase = increase  # Added to the rate after each successful request
+        self.decrease = decrease  # Multiplied into the rate after each 429
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.queue_depth = 0  # Threads currently waiting for a token
+        self.requests = 0
+        self.rate_limited = 0
+        self.wait_time = 0.0  # Total seconds threads spent waiting for tokens
+        self.condition = Condition()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """Block until a request is allowed."""
+        started_at = time.monotonic()
+        with self.condition:
+            self.queue_depth += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.refill(now)
+                    if now < self.paused_until:
+                        wait = self.paused_until - now
+                    elif self.tokens >= 1:
+                        self.tokens -= 1
+                        self.requests += 1
+                        break
+                    else:
+                        wait = (1 - self.tokens) / self.rate
+                    self.condition.wait(wait)
+            finally:
+                self.queue_depth -= 1
+                self.wait_time += time.monotonic() - started_at
+
+    def on_success(self):
+        """Speed up a little after a successful request."""
+        with self.condition:
+            self.refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_rate_limited(self, retry_after=None):
+        """Slow down after a 429, pausing everyone for retry_after seconds if given."""
+        with self.condition:
+            now = time.monotonic()
+            self.refill(now)
+            self.rate_limited += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = 0.0
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            self.condition.notify_all()
+
+    def stats(self):
+        """Return the limiter's current rate, queue depth and counters."""
+        with self.condition:
+            return {
+                'rate': round(self.rate, 3),
+                'queue_depth': self.queue_depth,
+                'requests': self.requests,
+                'rate_limited': self.rate_limited,
+                'wait_time': round(self.wait_time, 3),
+            }
+
+class RateLimitedSession(requests.Session):
+    """requests session that takes a token before each request and reports 429s.
+
+    If a RunMetrics is given, each request's latency (not counting the wait for a
+    token) and each 429 are recorded in it.
+    """
+
+    def __init__(self, limiter, metrics=None, metrics_name='request'):
+        super().__init__()
+        self.limiter = limiter
+        self.metrics = metrics
+        self.metrics_name = metrics_name
+
+    def request(self, method, url, *args, **kwargs):
+        self.limiter.acquire()
+        started_at = time.perf_counter()
+        response = super().request(method, url, *args, **kwargs)
+        if self.metrics:
+            self.metrics.observe(self.metrics_name, time.perf_counter() - started_at)
+            if response.status_code == 429:
+                self.metrics.increment(f"{self.metrics_name}_rate_limited")
+        if response.status_code == 429:
+            self.limiter.on_rate_limited(parse_retry_after(response.headers.get('Retry-After')))
+        elif response.status_code < 400:
+            self.limiter.on_success()
+        return response
+#endregion Classes
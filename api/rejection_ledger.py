@@ -0,0 +1,98 @@
+'''
+Persistent ledger of tracks that curate_data.py skipped, and why.
+
+Tracks whose lyrics weren't found, had no chorus or had too few unique words are
+recorded by Spotify track ID, with the title and artist they were looked up by and a
+hash of the lyrics they were judged on. Later runs skip these tracks before making
+any Genius requests, until the entry expires, the chorus rules change, the track's
+title or artist changes, its cached lyrics no longer match the hash, or a recheck is
+forced.
+'''
+
+import hashlib
+import time
+
+from sqlite_store import SqliteStore
+
+#region Functions
+def hash_lyrics(lyrics):
+    return hashlib.sha256(lyrics.encode('utf-8')).hexdigest() if lyrics else None
+#endregion Functions
+
+#region Classes
+class RejectionLedger(SqliteStore):
+    """SQLite-backed record of skipped tracks with a TTL, tied to the rules they were judged by."""
+
+    TABLE = 'rejections'
+    KEY = 'spotify_id'
+    COLUMNS = '''
+        spotify_id TEXT PRIMARY KEY,
+        lyrics_hash TEXT,
+        reason TEXT NOT NULL,
+        rules TEXT NOT NULL,
+        rejected_at REAL NOT NULL,
+        title TEXT,
+        artist TEXT'''
+
+    def __init__(self, db_path, rules, ttl_seconds=30 * 24 * 60 * 60, recheck=False):
+        super().__init__(db_path)
+        self.rules = rules  # Fingerprint of the chorus rules; entries made under other rules are ignored
+        self.ttl_seconds = ttl_seconds
+        self.recheck = recheck  # Ignore every entry (they are still updated)
+        self.skipped = 0
+        self.recorded = 0
+        self.cleared = 0
+
+        # Ledgers from before titles were recorded get the columns added (their entries are rechecked once)
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(rejections)')}
+        for column in ('title', 'artist'):
+            if column not in columns:
+                self.connection.execute(f'ALTER TABLE rejections ADD COLUMN {column} TEXT')
+        self.connection.commit()
+
+    def get(self, spotify_id, title, artist, lyrics=None):
+        """Return why a track was skipped before, or None if it should be processed.
+
+        lyrics are the track's currently known raw lyrics (e.g. from the lyrics cache), if any.
+        """
+        if self.recheck:
+            return None
+        with self.lock:
+            row = self.row(spotify_id, 'reason, rules, rejected_at, title, artist, lyrics_hash')
+            if row is None or row[1] != self.rules:
+                return None
+            if self.ttl_seconds is not None and time.time() - row[2] > self.ttl_seconds:
+                return None
+            # A new title or artist means a different Genius search
+            if (row[3], row[4]) != (title, artist):
+                return None
+            # Lyrics other than the ones the track was judged on may pass this time
+            if lyrics is not None and hash_lyrics(lyrics) != row[5]:
+                return None
+            self.skipped += 1
+            return row[0]
+
+    def record(self, spotify_id, title, artist, reason, lyrics=None):
+        """Record that a track was skipped for reason, judged on lyrics (None if none were found)."""
+        with self.lock:
+            self.store(spotify_id=spotify_id, lyrics_hash=hash_lyrics(lyrics), reason=reason, rules=self.rules,
+                       rejected_at=time.time(), title=title, artist=artist)
+            self.connection.commit()
+            self.recorded += 1
+
+    def clear(self, spotify_id):
+        """Forget a track that has since made it into the game data."""
+        with self.lock:
+            if self.delete(spotify_id):
+                self.connection.commit()
+                self.cleared += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'skipped': self.skipped,
+                'recorded': self.recorded,
+                'cleared': self.cleared,
+                'entries': self.count(),
+            }
+#endregion Classes
@@ -0,0 +1,148 @@
+'''
+Timing and counters for a curate_data.py run, written out as a JSON report.
+
+Records wall time per pipeline stage, latency histograms per kind of request,
+counters (retries, 429s, timeouts), time spent sleeping and why, and the reasons
+tracks were skipped. The report can also be rewritten periodically while the run
+is in progress.
+'''
+
+import bisect
+import json
+import os
+import time
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+
+#region Global Variable Declarations
+# Upper bounds (in milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+#endregion Global Variable Declarations
+
+#region Classes
+class LatencyHistogram:
+    """Counts of observed durations per latency bucket, plus their total and maximum."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self):
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 3),
+            'mean_ms': round(self.total / self.count * 1000, 1) if self.count else 0,
+            'max_ms': round(self.max * 1000, 1),
+            'buckets': {label: count for label, count in zip(labels, self.buckets) if count},
+        }
+
+class RunMetrics:
+    """Thread-safe collector for a single run's metrics."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.started_at = time.time()
+        self.stages = {}
+        self.latencies = {}
+        self.counters = {}
+        self.sleeps = {}
+        self.skips = {}
+        self.extra = {}
+        self.live_stop = None
+        self.live_thread = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time a pipeline stage. Stages that run more than once add up."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started_at
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def timed(self, name):
+        """Time a single request or step into the name latency histogram."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at)
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.latencies.get(name)
+            if histogram is None:
+                histogram = self.latencies[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_sleep(self, reason, seconds):
+        with self.lock:
+            self.sleeps[reason] = self.sleeps.get(reason, 0.0) + seconds
+
+    def record_skip(self, reason):
+        with self.lock:
+            self.skips[reason] = self.skips.get(reason, 0) + 1
+
+    def set(self, name, value):
+        """Attach other stats (e.g. the rate limiter's or cache's) to the report."""
+        with self.lock:
+            self.extra[name] = value
+
+    def report(self):
+        with self.lock:
+            return {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+                'elapsed_seconds': round(time.time() - self.started_at, 3),
+                'stages': {name: round(seconds, 3) for name, seconds in self.stages.items()},
+                'latency': {name: histogram.to_dict() for name, histogram in self.latencies.items()},
+                'counters': dict(self.counters),
+                'sleep_seconds': {reason: round(seconds, 3) for reason, seconds in self.sleeps.items()},
+                'skipped': dict(self.skips),
+                **self.extra,
+            }
+
+    def write(self, file_path):
+        """Write the report, replacing the previous one in a single step."""
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = file_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=4)
+        os.replace(temp_path, file_path)
+
+    def start_live(self, file_path, interval):
+        """Rewrite the report every interval seconds until stop_live() is called."""
+        self.live_stop = Event()
+
+        def write_periodically(stop):
+            while not stop.wait(interval):
+                self.write(file_path)
+
+        self.live_thread = Thread(target=write_periodically, args=(self.live_stop,), daemon=True)
+        self.live_thread.start()
+
+    def stop_live(self):
+        """Stop the live report, waiting for a write in progress so it can't race the final one."""
+        if self.live_stop:
+            self.live_stop.set()
+            self.live_thread.join()
+            self.live_stop = None
+            self.live_thread = None
+#endregion Classes
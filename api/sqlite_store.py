@@ -0,0 +1,84 @@
+'''
+Shared plumbing for the on-disk SQLite stores: the lyrics, censor and HTTP caches,
+the Genius index and the rejection ledger.
+
+Each store is one table keyed by one column. SqliteStore opens the database (creating
+its directory), creates the table, guards the connection with a lock so lookup threads
+can share it, and evicts the least recently used rows beyond a maximum count. The
+stores themselves only define their schema and how their values are encoded.
+'''
+
+import os
+import sqlite3
+import time
+from threading import Lock
+
+#region Classes
+class SqliteStore:
+    """A SQLite table keyed by one column, with optional least-recently-used eviction.
+
+    Subclasses set TABLE, KEY and COLUMNS (the column definitions), and ACCESSED to the
+    column holding each row's last use if rows are evicted. Only close() takes the lock,
+    so a store can make several of these calls under it as one step.
+    """
+
+    TABLE = None
+    KEY = None
+    COLUMNS = None
+    ACCESSED = None
+
+    def __init__(self, db_path, max_entries=None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self.lock = Lock()
+
+        # Ensure the database directory exists
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute(f'CREATE TABLE IF NOT EXISTS {self.TABLE} ({self.COLUMNS})')
+        if self.ACCESSED:
+            self.connection.execute(f'CREATE INDEX IF NOT EXISTS {self.TABLE}_{self.ACCESSED} ON {self.TABLE} ({self.ACCESSED})')
+        self.connection.commit()
+
+    def row(self, key, columns):
+        """Return the given columns (comma-separated) of the row for key, or None."""
+        return self.connection.execute(f'SELECT {columns} FROM {self.TABLE} WHERE {self.KEY} = ?', (key,)).fetchone()
+
+    def store(self, **values):
+        """Insert a row, replacing the row with the same key if there is one."""
+        self.connection.execute(
+            f'INSERT OR REPLACE INTO {self.TABLE} ({", ".join(values)}) VALUES ({", ".join("?" * len(values))})',
+            tuple(values.values()))
+
+    def touch(self, key, now=None):
+        """Mark the row for key as just used, so it is evicted last."""
+        self.connection.execute(f'UPDATE {self.TABLE} SET {self.ACCESSED} = ? WHERE {self.KEY} = ?',
+                                (time.time() if now is None else now, key))
+
+    def delete(self, key):
+        """Remove the row for key, returning whether there was one."""
+        return self.connection.execute(f'DELETE FROM {self.TABLE} WHERE {self.KEY} = ?', (key,)).rowcount > 0
+
+    def count(self):
+        return self.connection.execute(f'SELECT COUNT(*) FROM {self.TABLE}').fetchone()[0]
+
+    def evict(self):
+        """Remove the least recently used rows beyond max_entries."""
+        if self.max_entries is None:
+            return
+        excess = self.count() - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                f'DELETE FROM {self.TABLE} WHERE {self.KEY} IN '
+                f'(SELECT {self.KEY} FROM {self.TABLE} ORDER BY {self.ACCESSED} LIMIT ?)',
+                (excess,))
+            self.evictions += excess
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+#endregion Classes
@@ -0,0 +1,128 @@
+'''
+To run:
+python -m pytest api
+
+Golden tests for CensorEngine: its output has to stay identical (same asterisk lengths,
+same hyphen handling) to the original per-word censor_text, kept below as the reference.
+The banned words and phrase replacements are read from the repo's own (base64-encoded)
+files rather than spelled out here.
+'''
+
+import os
+import random
+import re
+
+import pytest
+
+from censor_lyrics import CensorEngine, decode_banned_words, load_censor_overrides, load_json_file
+
+#region Global Variable Declarations
+api_dir = os.path.dirname(os.path.abspath(__file__))
+BANNED_WORDS = decode_banned_words(load_json_file(os.path.join(api_dir, 'bannedWords.json'))['bannedWordsBase64'])
+PHRASES = load_censor_overrides(os.path.join(api_dir, 'censorOverrides.json'))['phrases']
+# Letters that re's case-insensitive matching treats differently from str.lower()
+# (dotted and dotless i, long s, Kelvin sign, sharp s, combining dot above)
+CASE_EDGE_LETTERS = ['i', 'I', '\u0130', '\u0131', '\u0307', 's', 'S', '\u017f', 'k', 'K', '\u212a', '\u00df', 'a']
+# Banned words and choruses where lowercasing a match doesn't tell which banned words it is
+CASE_EDGE_CASES = [
+    (['i', '\u0131i', '\u0131'], 'Ii'),
+    (['s\u0131', '\u0131', 'I'], 'II'),
+    (['k', 's', '\u017fI'], 'I\u0130KIS\u0130\u0307s\u0130-\n '),
+    (['\u0131', 'ksi', '\u0130'], '\u0307\u0130-a\u00dfK\u00df\u0307K-Ks-'),
+    (['kill'], 'K\u0130LL ki\u0307ll \u212aill'),
+]
+#endregion Global Variable Declarations
+
+#region Functions
+def original_censor_text(text, banned_words, specific_patterns=()):
+    """censor_text as it was before CensorEngine, with its hard-coded phrase replacements passed in."""
+    if not text:
+        return text
+
+    censored_text = text
+
+    # Apply specific replacements first
+    for pattern, replacement in specific_patterns:
+        censored_text = censored_text.replace(pattern, replacement)
+
+    # Process each banned word
+    for word in banned_words:
+        word_lower = word.lower()
+
+        # Simple case: exact word match with word boundaries
+        pattern = r'\b' + re.escape(word_lower) + r'\b'
+        censored_text = re.sub(pattern, '*' * len(word_lower), censored_text, flags=re.IGNORECASE)
+
+        # Replace the word at the beginning of lines
+        line_start_pattern = r'(^|\n)(' + re.escape(word_lower) + r')'
+        censored_text = re.sub(line_start_pattern, r'\1' + '*' * len(word_lower), censored_text, flags=re.IGNORECASE)
+
+    # Handle hyphenated combinations separately
+    for word in banned_words:
+        word_lower = word.lower()
+
+        # For word-xxx pattern
+        prefix_pattern = r'\b' + re.escape(word_lower) + r'-\w+'
+
+        def replace_prefix(match):
+            text = match.group(0)
+            parts = text.split('-', 1)
+            return '*' * len(parts[0]) + '-' + parts[1]
+
+        censored_text = re.sub(prefix_pattern, replace_prefix, censored_text, flags=re.IGNORECASE)
+
+        # For xxx-word pattern
+        suffix_pattern = r'\w+-' + re.escape(word_lower) + r'\b'
+
+        def replace_suffix(match):
+            text = match.group(0)
+            parts = text.split('-', 1)
+            return parts[0] + '-' + '*' * len(parts[1])
+
+        censored_text = re.sub(suffix_pattern, replace_suffix, censored_text, flags=re.IGNORECASE)
+
+    return censored_text
+
+def golden_texts():
+    """Choruses built around each banned word and phrase: case, line starts, hyphens and word boundaries."""
+    texts = ['', 'Nothing to see here\nat all']
+    for word in BANNED_WORDS:
+        texts += [
+            word,
+            f"{word.upper()} at the start\nand {word.title()} at the end {word}",
+            f"mid{word}dle and {word}s and un{word}",
+            f"{word}-like and like-{word} and x-{word}-y\n{word}-\n-{word}",
+            f"{word}_{word} {word}1 1{word} {word}\u00e9 \u00e9{word}",
+            ' '.join([word + '\u0130', word.replace('i', '\u0131'), word.replace('s', '\u017f'), word.replace('k', '\u212a')]),
+        ]
+    for pattern, _ in PHRASES:
+        texts += [pattern, f"So {pattern} again,\n{pattern.upper()}", pattern.replace(' ', '  ')]
+    return texts
+#endregion Functions
+
+@pytest.mark.parametrize('text', golden_texts())
+def test_censor_matches_original(text):
+    engine = CensorEngine(BANNED_WORDS, PHRASES)
+    assert engine.censor(text) == original_censor_text(text, BANNED_WORDS, PHRASES)
+
+def test_censor_matches_original_on_random_choruses():
+    rng = random.Random(1)
+    engine = CensorEngine(BANNED_WORDS, PHRASES)
+    fragments = (BANNED_WORDS + [word.upper() for word in BANNED_WORDS] + [word.title() for word in BANNED_WORDS]
+                 + [pattern for pattern, _ in PHRASES] + ['-', '\n', ' ', ', ', 'a', '_', '1', '\u00e9'] + CASE_EDGE_LETTERS)
+    for _ in range(20000):
+        text = ''.join(rng.choice(fragments) for _ in range(rng.randint(0, 12)))
+        assert engine.censor(text) == original_censor_text(text, BANNED_WORDS, PHRASES), repr(text)
+
+@pytest.mark.parametrize('words, text', CASE_EDGE_CASES)
+def test_censor_matches_original_on_case_folding(words, text):
+    assert CensorEngine(words).censor(text) == original_censor_text(text, words)
+
+def test_censor_matches_original_on_random_case_folding():
+    # Banned words and text made of letters whose case-insensitive matches differ from str.lower()
+    rng = random.Random(3)
+    fragments = CASE_EDGE_LETTERS + ['-', ' ', '\n']
+    for _ in range(10000):
+        words = [''.join(rng.choice(CASE_EDGE_LETTERS) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 4))]
+        text = ''.join(rng.choice(fragments) for _ in range(rng.randint(0, 14)))
+        assert CensorEngine(words).censor(text) == original_censor_text(text, words), (words, text)
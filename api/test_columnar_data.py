@@ -0,0 +1,110 @@
+'''
+To run:
+python -m pytest api
+
+Round-trip tests for the columnar .lyrc game data format.
+'''
+
+import json
+
+import pytest
+
+from columnar_data import GameDataWriter, dump_songs, is_columnar, load_songs, read_game_data, write_game_data
+
+#region Global Variable Declarations
+SONGS = [
+    {'spotify_id': 'a1', 'title': 'First', 'artist': 'Same Artist', 'preview_url': None, 'chorus': 'La la la\nLa la'},
+    {'spotify_id': 'b2', 'title': 'Second', 'artist': 'Same Artist', 'preview_url': 'https://p.scdn.co/mp3-preview/b2',
+     'chorus': 'Smile \U0001F600 and sing \u00e9t\u00e9\n\u4f60\u597d'},
+    {'spotify_id': 'c3', 'title': '', 'artist': 'Other Artist', 'preview_url': None, 'chorus': ''},
+]
+#endregion Global Variable Declarations
+
+def test_round_trip():
+    assert load_songs(dump_songs(SONGS)) == SONGS
+
+def test_round_trip_keeps_key_order():
+    assert [list(song) for song in load_songs(dump_songs(SONGS))] == [list(song) for song in SONGS]
+
+def test_empty_list():
+    assert load_songs(dump_songs([])) == []
+
+def test_all_none_column():
+    songs = [{'spotify_id': str(i), 'preview_url': None} for i in range(3)]
+    assert load_songs(dump_songs(songs)) == songs
+
+def test_repeated_values_are_stored_once():
+    songs = [{'spotify_id': str(i), 'artist': 'Very Long Repeated Artist Name'} for i in range(100)]
+    content = dump_songs(songs)
+    assert content.count(b'Very Long Repeated Artist Name') == 1
+    assert load_songs(content) == songs
+
+def test_unique_and_repeated_columns():
+    # spotify_id is unique per song (stored without an index), artist repeats (stored with one)
+    songs = [{'spotify_id': str(i), 'artist': f"Artist {i % 3}"} for i in range(10)]
+    assert load_songs(dump_songs(songs)) == songs
+
+def test_non_bmp_text():
+    songs = [{'spotify_id': 'x', 'chorus': '\U0001F3B6\U0001F600 a \U00010348 b \U0001F600'}]
+    assert load_songs(dump_songs(songs)) == songs
+
+def test_mismatched_keys():
+    with pytest.raises(ValueError):
+        dump_songs([{'spotify_id': 'a', 'title': 'A'}, {'spotify_id': 'b'}])
+
+def test_non_string_values():
+    with pytest.raises(ValueError):
+        dump_songs([{'spotify_id': 'a', 'plays': 3}])
+
+def test_not_a_lyrc_file():
+    with pytest.raises(ValueError):
+        load_songs(b'[{"spotify_id": "a"}]')
+
+def test_game_data_files(tmp_path):
+    columnar_path = str(tmp_path / 'gameData.lyrc')
+    json_path = str(tmp_path / 'gameData.json')
+    write_game_data(columnar_path, SONGS)
+    write_game_data(json_path, SONGS)
+
+    assert is_columnar(columnar_path) and not is_columnar(json_path)
+    assert read_game_data(columnar_path) == read_game_data(json_path) == SONGS
+    with open(json_path, 'r', encoding='utf-8') as file:
+        assert json.load(file) == SONGS
+
+@pytest.mark.parametrize('songs', [SONGS, []])
+@pytest.mark.parametrize('ensure_ascii', [False, True])
+def test_writer_matches_json_dump(tmp_path, songs, ensure_ascii):
+    path = str(tmp_path / 'gameData.json')
+    writer = GameDataWriter(path, ensure_ascii=ensure_ascii)
+    for song in songs:
+        writer.write(song)
+    writer.close()
+    with open(path, 'r', encoding='utf-8') as file:
+        assert file.read() == json.dumps(songs, indent=4, ensure_ascii=ensure_ascii)
+    assert writer.count == len(songs)
+
+def test_writer_json_lines(tmp_path):
+    path = str(tmp_path / 'gameData.jsonl')
+    writer = GameDataWriter(path)
+    for song in SONGS:
+        writer.write(song)
+    writer.close()
+    with open(path, 'r', encoding='utf-8') as file:
+        assert [json.loads(line) for line in file] == SONGS
+
+def test_writer_columnar(tmp_path):
+    path = str(tmp_path / 'gameData.lyrc')
+    writer = GameDataWriter(path)
+    for song in SONGS:
+        writer.write(song)
+    writer.close()
+    assert read_game_data(path) == SONGS
+
+def test_writer_discard_keeps_previous_file(tmp_path):
+    path = str(tmp_path / 'gameData.json')
+    write_game_data(path, SONGS)
+    writer = GameDataWriter(path)
+    writer.write(SONGS[0])
+    writer.discard()
+    assert read_game_data(path) == SONGS
+    assert not (tmp_path / 'gameData.json.tmp').exists()
@@ -0,0 +1,52 @@
+'''
+To run:
+python -m pytest api
+
+Tests for the Genius lookup retries in curate_data.py.
+'''
+
+import pytest
+from requests.exceptions import HTTPError
+
+import curate_data
+from curate_data import GeniusLookupFailed, search_song_with_retry
+
+#region Classes
+class FailingGenius:
+    """Stands in for lyricsgenius.Genius, raising HTTPError the way lyricsgenius does: (status code, message)."""
+
+    def __init__(self, status, url):
+        self.status = status
+        self.url = url
+        self.calls = 0
+
+    def search_song(self, title, artist, song_id=None):
+        self.calls += 1
+        raise HTTPError(self.status, f"{self.status} Client Error: for url: {self.url}")
+#endregion Classes
+
+@pytest.fixture(autouse=True)
+def quiet_metrics(monkeypatch):
+    monkeypatch.setattr(curate_data, 'run_metrics', curate_data.RunMetrics())
+
+def test_stale_id_is_not_retried():
+    genius = FailingGenius(404, 'https://api.genius.com/songs/1234567')
+    assert search_song_with_retry(genius, 'Song', 'Artist', delay=0, song_id=1234567) is None
+    assert genius.calls == 1
+
+def test_stale_id_containing_429_is_not_retried():
+    genius = FailingGenius(404, 'https://api.genius.com/songs/1429001?text_format=plain')
+    assert search_song_with_retry(genius, 'Song', 'Artist', delay=0, song_id=1429001) is None
+    assert genius.calls == 1
+    assert curate_data.run_metrics.counters.get('genius_searches_rate_limited', 0) == 0
+
+def test_rate_limited_lookup_is_retried():
+    genius = FailingGenius(429, 'https://api.genius.com/songs/42')
+    with pytest.raises(GeniusLookupFailed):
+        search_song_with_retry(genius, 'Song', 'Artist', max_retries=3, delay=0, song_id=42)
+    assert genius.calls == 3
+    assert curate_data.run_metrics.counters['genius_searches_rate_limited'] == 3
+
+def test_genius_client_leaves_pacing_to_the_limiter():
+    genius = curate_data.create_genius_client('token', curate_data.AdaptiveRateLimiter())
+    assert genius.sleep_time == 0
@@ -0,0 +1,111 @@
+'''
+To run:
+python -m pytest api
+
+Golden tests for LyricsNormalizer: its output has to stay byte-identical to the
+original step-by-step clean_up_lyrics from curate_data.py, kept below as the reference.
+'''
+
+import random
+import re
+
+import pytest
+
+from lyrics_processing import LyricsNormalizer
+
+#region Global Variable Declarations
+# Raw lyrics the way lyricsgenius returns them
+RAW_LYRICS = {
+    'contributors_and_embed': (
+        "123 ContributorsTranslationsEspa\u00f1olSong Title Lyrics[Verse 1]\n"
+        "First line of the verse\nSecond line of the verse\n"
+        "[Chorus]\nThis is the chorus\nSing it again\n\n\n\n"
+        "[Outro]\nGoodbye now42Embed"
+    ),
+    'you_might_also_like': (
+        "5 ContributorsAnother Song Lyrics[Verse 1]\nA line\nAnother line\n"
+        "You might also like[Chorus]\nChorus line\n"
+        "Some words You might also like more words\n"
+        "YouYou might also like might also like\n"
+        "[Verse 2]\nLast line7Embed"
+    ),
+    'liveget': (
+        "[Intro]\nHey\nSee Artist LiveGet tickets as low as $65\n"
+        "[Chorus]\nLiveGet tickets as low as\nStill singing"
+    ),
+    'parentheses_across_lines': (
+        "[Verse]\nI said (oh\nyeah, yeah) we go\n(Whispered)\n"
+        "[Chorus]\nOpen ( never closed\nClosed ) too\n((nested) parts)\nEmbed"
+    ),
+    'folded_characters': (
+        "[Verse]\nD\u0435ar, it\u2019s late\u2005now\n"
+        "[Chorus]\nCan\u2019t\u2005stop, won\u2019t\u2005stop\u0435"
+    ),
+    'embed_only_on_blanked_line': (
+        "[Chorus]\nLine one\nYou might also like2Embed"
+    ),
+    'no_newline_at_all': "Just one line with Contributors in itEmbed",
+    'empty': "",
+}
+# Pieces that trigger each rule, for the randomized comparison
+FRAGMENTS = ['\n', '\n\n', '\n\n\n', '[', ']', '[Chorus]', '(', ')', 'Contributors', 'Embed', '12Embed',
+             'You might also like', 'You might', ' also like', 'LiveGet tickets as low as', 'word', ' ',
+             '\u0435', '\u2019', '\u2005', '\u00e9']
+#endregion Global Variable Declarations
+
+#region Functions
+def original_clean_up_lyrics(lyrics):
+    """clean_up_lyrics as it was before LyricsNormalizer, unchanged."""
+    # Remove any instance of "You might also like" from song.lyrics
+    lyrics = lyrics.replace('You might also like', '')
+
+    # ensure all [ are preceeded by 2 newlines
+    lyrics = lyrics.replace('[', '\n\n[')
+
+    # Use a RegEx to ensure there are no more than 2 consecutive newlines
+    lyrics = re.sub(r'\n{3,}', '\n\n', lyrics)
+
+    # Remove any line that contains the string "Contributors"
+    lyrics = '\n'.join([line for line in lyrics.split('\n') if 'Contributors' not in line])
+
+    # If the last line ends in "Embed", remove "Embed" and any preceding numbers
+    if lyrics.split('\n')[-1].endswith('Embed'):
+        lyrics = '\n'.join(lyrics.split('\n')[:-1])
+
+    # Remove any line that contains the string "You might also like" using RegEx
+    lyrics = re.sub(r'^.*You might also like.*$', '', lyrics, flags=re.MULTILINE)
+
+    # Remove any line that contains the string "LiveGet tickets as low as"
+    lyrics = re.sub(r'^.*LiveGet tickets as low as.*$', '', lyrics, flags=re.MULTILINE)
+
+    # Remove any instance of parentheses and their contents
+    # Lyrics within parenthesis often indicate lyrics that you can barely hear and likely would never know, so we remove them
+    lyrics = re.sub(r'\([^)]*\)', '', lyrics)
+
+    # Replace nonstandard characters with standard characters
+    lyrics = lyrics.replace('\u0435', "e")
+    lyrics = lyrics.replace('\u2019', "'")
+    lyrics = lyrics.replace('\u2005', " ")
+
+    return lyrics
+#endregion Functions
+
+@pytest.mark.parametrize('name', RAW_LYRICS)
+def test_normalize_matches_original(name):
+    lyrics = RAW_LYRICS[name]
+    assert LyricsNormalizer().normalize(lyrics) == original_clean_up_lyrics(lyrics)
+
+def test_normalize_matches_original_on_random_lyrics():
+    rng = random.Random(9)
+    normalizer = LyricsNormalizer()
+    for _ in range(20000):
+        lyrics = ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 30)))
+        assert normalizer.normalize(lyrics) == original_clean_up_lyrics(lyrics), repr(lyrics)
+
+def test_extra_character_folding():
+    normalizer = LyricsNormalizer({'\u201c': '"', '\u201d': '"'})
+    assert normalizer.normalize('[Chorus]\n\u201cHi\u201d it\u2019s me') == '\n\n[Chorus]\n"Hi" it\'s me'
+
+def test_multi_character_folding():
+    normalizer = LyricsNormalizer({'...': '\u2026', '..': '.', '\u201c': '"'})
+    assert normalizer.normalize('Wait... \u201cno\u201d.. ok\u2019') == 'Wait\u2026 "no\u201d. ok\''
@@ -0,0 +1,129 @@
+'''
+To run:
+python -m pytest api
+
+Tests for the adaptive Genius rate limiter: rate adjustments, Retry-After pauses
+and the session that reports responses to it. Time is faked, so nothing sleeps.
+'''
+
+from email.utils import formatdate
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+import rate_limiter
+from rate_limiter import AdaptiveRateLimiter, RateLimitedSession, parse_retry_after
+
+#region Classes
+class FakeClock:
+    """Stands in for time.monotonic, and for Condition.wait by moving the clock forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.waits = []
+
+    def monotonic(self):
+        return self.now
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+        self.now += timeout
+        return False
+
+class StubAdapter(BaseAdapter):
+    """Answers every request with the given status code and headers."""
+
+    def __init__(self, status, headers=None):
+        super().__init__()
+        self.status = status
+        self.headers = headers or {}
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = self.status
+        response.headers.update(self.headers)
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+#endregion Classes
+
+#region Functions
+def make_limiter(clock, **kwargs):
+    limiter = AdaptiveRateLimiter(**kwargs)
+    limiter.condition.wait = clock.wait
+    return limiter
+#endregion Functions
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock.monotonic)
+    return clock
+
+def test_rate_goes_up_on_success(clock):
+    limiter = make_limiter(clock, rate=2.0, max_rate=2.12, increase=0.05)
+    limiter.on_success()
+    assert limiter.rate == pytest.approx(2.05)
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.rate == pytest.approx(2.12)
+
+def test_rate_goes_down_on_429(clock):
+    limiter = make_limiter(clock, rate=2.0, min_rate=0.3, decrease=0.5)
+    limiter.on_rate_limited()
+    assert limiter.rate == pytest.approx(1.0)
+    assert limiter.tokens == 0
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    assert limiter.rate == pytest.approx(0.3)
+    assert limiter.stats()['rate_limited'] == 3
+
+def test_burst_then_rate(clock):
+    limiter = make_limiter(clock, rate=4.0, burst=2)
+    limiter.acquire()
+    limiter.acquire()
+    assert clock.waits == []
+    limiter.acquire()
+    assert sum(clock.waits) == pytest.approx(0.25)
+
+def test_retry_after_pauses_everyone(clock):
+    limiter = make_limiter(clock, rate=4.0, decrease=0.5)
+    limiter.on_rate_limited(retry_after=30)
+    started_at = clock.now
+    limiter.acquire()
+    assert clock.now - started_at == pytest.approx(30)
+    assert limiter.stats()['wait_time'] == pytest.approx(30)
+
+def test_shorter_retry_after_does_not_cut_pause(clock):
+    limiter = make_limiter(clock)
+    limiter.on_rate_limited(retry_after=30)
+    limiter.on_rate_limited(retry_after=5)
+    assert limiter.paused_until == clock.now + 30
+
+@pytest.mark.parametrize('value, expected', [(None, None), ('', None), ('12', 12.0), ('1.5', 1.5), ('-3', 0.0),
+                                             ('soon', None)])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+def test_parse_retry_after_http_date():
+    assert parse_retry_after(formatdate(rate_limiter.time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
+
+def test_session_reports_429_with_retry_after(clock):
+    limiter = make_limiter(clock, rate=2.0, decrease=0.5)
+    session = RateLimitedSession(limiter)
+    session.mount('https://', StubAdapter(429, {'Retry-After': '7'}))
+    assert session.get('https://api.genius.com/search').status_code == 429
+    assert limiter.rate == pytest.approx(1.0)
+    assert limiter.paused_until == clock.now + 7
+
+def test_session_reports_success(clock):
+    limiter = make_limiter(clock, rate=2.0, increase=0.05)
+    session = RateLimitedSession(limiter)
+    session.mount('https://', StubAdapter(200))
+    session.get('https://api.genius.com/search')
+    assert limiter.rate == pytest.approx(2.05)
+    assert limiter.stats()['requests'] == 1
@@ -0,0 +1,145 @@
+'''
+To run:
+python -m pytest api
+
+Eviction and invalidation tests for the SQLite stores built on SqliteStore: the lyrics,
+censor and HTTP caches, the Genius index and the rejection ledger. Time is faked so
+that every write and lookup gets its own timestamp.
+'''
+
+import time
+
+import pytest
+import requests
+
+from censor_cache import CensorCache
+from genius_index import GeniusIndex
+from http_sessions import HttpCache
+from lyrics_cache import CachedSong, LyricsCache
+from rejection_ledger import RejectionLedger
+
+#region Classes
+class FakeClock:
+    """Stands in for time.time, moving one second forward on every call."""
+
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+#endregion Classes
+
+#region Functions
+def genius_song(title):
+    return CachedSong(1, title, 'Artist', f"https://genius.com/{title}", f"[Chorus]\n{title} lyrics")
+
+def json_response(content, etag):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers.update({'Content-Type': 'application/json', 'ETag': etag})
+    response._content = content
+    return response
+#endregion Functions
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, 'time', clock)
+    return clock
+
+def test_lyrics_cache_evicts_least_recently_used(tmp_path):
+    cache = LyricsCache(str(tmp_path / 'lyrics.sqlite'), max_entries=2)
+    cache.put('a', genius_song('A'))
+    cache.put('b', genius_song('B'))
+    assert cache.get('a').title == 'A'
+    cache.put('c', genius_song('C'))
+    assert cache.get('b') is None
+    assert cache.get('a').title == 'A' and cache.get('c').title == 'C'
+    assert cache.stats()['evictions'] == 1
+    cache.close()
+
+def test_lyrics_cache_expires_entries(tmp_path, clock):
+    cache = LyricsCache(str(tmp_path / 'lyrics.sqlite'), ttl_seconds=60)
+    cache.put('a', genius_song('A'))
+    assert cache.peek('a') is not None
+    clock.now += 120
+    assert cache.peek('a') is None
+    assert cache.get('a') is None
+    assert cache.stats()['expired'] == 1 and cache.stats()['entries'] == 0
+    cache.close()
+
+def test_censor_cache_evicts_least_recently_used_on_flush(tmp_path):
+    cache = CensorCache(str(tmp_path / 'censor.sqlite'), [], max_entries=2)
+    for text in ('one', 'two', 'three'):
+        cache.put(text, [], text.upper())
+    assert cache.get('one', []) == 'ONE'
+    cache.flush()
+    assert cache.get('two', []) is None
+    assert cache.get('one', []) == 'ONE' and cache.get('three', []) == 'THREE'
+    assert cache.stats()['evictions'] == 1
+    cache.close()
+
+def test_censor_cache_invalidates_on_banned_words(tmp_path):
+    db_path = str(tmp_path / 'censor.sqlite')
+    cache = CensorCache(db_path, [])
+    cache.put('bad word', ['bad'], '*** word')
+    cache.close()
+
+    cache = CensorCache(db_path, [])
+    assert cache.get('bad word', ['bad']) == '*** word'
+    assert cache.get('bad word', ['bad', 'word']) is None
+    cache.close()
+
+def test_http_cache_evicts_least_recently_used_on_close(tmp_path):
+    db_path = str(tmp_path / 'http.sqlite')
+    cache = HttpCache(db_path, max_entries=2)
+    for name in ('a', 'b', 'c'):
+        cache.put(f"https://api.example.com/{name}", json_response(b'{"name": "%s"}' % name.encode(), f'"{name}"'))
+    assert cache.load('https://api.example.com/a') == ({'Content-Type': 'application/json', 'ETag': '"a"'}, b'{"name": "a"}')
+    cache.close()
+
+    cache = HttpCache(db_path, max_entries=2)
+    assert cache.get('https://api.example.com/b') is None
+    assert cache.get('https://api.example.com/a') == ('"a"', None)
+    assert cache.get('https://api.example.com/c') == ('"c"', None)
+    assert cache.stats()['entries'] == 2
+    cache.close()
+
+def test_genius_index_forgets_songs(tmp_path):
+    db_path = str(tmp_path / 'geniusIndex.sqlite')
+    index = GeniusIndex(db_path)
+    index.put('spotify1', 'Song', 'Artist', 11)
+    index.put('spotify2', 'Other Song', 'Artist', 22)
+    index.forget(11)
+    assert index.lookup('spotify1', 'Song', 'Artist') == (None, False)
+    index.close()
+
+    index = GeniusIndex(db_path)
+    assert index.lookup('spotify1', 'Song', 'Artist') == (None, False)
+    assert index.lookup('spotify2', 'Other Song', 'Artist') == (22, False)
+    assert index.stats()['entries'] == 1
+    index.close()
+
+def test_rejection_ledger_invalidation(tmp_path, clock):
+    db_path = str(tmp_path / 'rejectionLedger.sqlite')
+    ledger = RejectionLedger(db_path, 'rules-1', ttl_seconds=60)
+    ledger.record('a', 'Song A', 'Artist', 'no_chorus', 'la la')
+    ledger.record('b', 'Song B', 'Artist', 'not_found')
+    assert ledger.get('a', 'Song A', 'Artist', 'la la') == 'no_chorus'
+    assert ledger.get('a', 'Song A', 'Artist', 'new lyrics') is None
+    assert ledger.get('a', 'Song A (Remix)', 'Artist') is None
+    ledger.clear('b')
+    assert ledger.get('b', 'Song B', 'Artist') is None
+    ledger.close()
+
+    ledger = RejectionLedger(db_path, 'rules-2', ttl_seconds=60)
+    assert ledger.get('a', 'Song A', 'Artist') is None
+    ledger.close()
+
+    ledger = RejectionLedger(db_path, 'rules-1', ttl_seconds=60)
+    assert ledger.get('a', 'Song A', 'Artist') == 'no_chorus'
+    clock.now += 120
+    assert ledger.get('a', 'Song A', 'Artist') is None
+    assert ledger.stats()['entries'] == 1
+    ledger.close()